@@ -0,0 +1,64 @@
+"""
+Benchmark of import time and worker spawn latency.
+
+Every module is imported in a fresh interpreter, and the time over an
+interpreter that only imports numpy is reported.  Then a process pool
+with the spawn start method is timed from creation until its first task,
+which imports the simulation, has returned.
+
+    python benchmarks/bench_import.py [repeat]
+"""
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+MODULES = ['pymarket', 'pymarket.book', 'pymarket.behavioral_book',
+           'pymarket.montecarlo', 'pymarket.sweep']
+
+
+def import_time(statement, repeat):
+    """ The best wall time of running statement in a fresh interpreter"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', statement], cwd=ROOT)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _task():
+    from pymarket.behavioral_book import go
+    return go.__name__
+
+
+def spawn_latency(repeat):
+    """ The best time from creating a spawn process pool to the result of
+    a first task that imports the simulation"""
+    context = multiprocessing.get_context('spawn')
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            pool.submit(_task).result()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(repeat=5):
+    base = import_time('import numpy', repeat)
+    print('{0:<26} {1:>8.1f} ms'.format('python + numpy', base * 1e3))
+    for module in MODULES:
+        elapsed = import_time('import numpy, {0}'.format(module), repeat)
+        print('{0:<26} {1:>+8.1f} ms'.format(module, (elapsed - base) * 1e3))
+    print('{0:<26} {1:>8.1f} ms'.format('spawn worker',
+                                        spawn_latency(repeat) * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,67 @@
+"""
+Microbenchmark of the best bid/ask lookup.
+
+Compares the PriceLevels heap ladder and the DenseLevels array ladder
+against scanning the keys of a plain dict with max(), which is what the
+book did before.  Each round removes the
+best level (as a market order that exhausts it would) and adds a new one.
+
+    python benchmarks/bench_ladder.py [levels] [rounds]
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from pymarket.book import PriceLevels, DenseLevels
+
+
+def make_prices(levels, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.permutation(np.arange(5000, 5000 + 2 * levels)).tolist()
+
+
+def dict_scan(prices, levels, rounds):
+    bids = dict((p, []) for p in prices[:levels])
+    refill = iter(prices[levels:])
+    for _ in range(rounds):
+        best = max(bids.keys())
+        bids.pop(best)
+        bids[next(refill)] = []
+
+
+def heap_ladder(prices, levels, rounds):
+    bids = PriceLevels('B', dict((p, []) for p in prices[:levels]))
+    refill = iter(prices[levels:])
+    for _ in range(rounds):
+        best = bids.best()
+        bids.pop(best)
+        bids[next(refill)] = []
+
+
+def dense_ladder(prices, levels, rounds):
+    bids = DenseLevels('B', center=5000 + levels, width=2 * levels)
+    slots = dict((p, bids.add(p, 1, (0, 0), 'A', 0)) for p in prices[:levels])
+    refill = iter(prices[levels:])
+    for _ in range(rounds):
+        best = bids.best()
+        bids.remove(best, slots.pop(best))
+        price = next(refill)
+        slots[price] = bids.add(price, 1, (0, 0), 'A', 0)
+
+
+def main(levels=5000, rounds=2000, repeat=5):
+    prices = make_prices(levels)
+    rounds = min(rounds, levels)
+    for name, func in [('dict scan', dict_scan), ('heap ladder', heap_ladder),
+                       ('dense ladder', dense_ladder)]:
+        best = min(timeit.repeat(lambda: func(prices, levels, rounds),
+                                 number=1, repeat=repeat))
+        print('{0:<13} {1:>6} levels  {2:>10.2f} us/fill'.format(
+            name, levels, best / rounds * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,246 @@
+"""
+Throughput benchmarks of the order book and the simulation, with fixed
+seeds.
+
+Measures orders per second for limit inserts, market orders sweeping a
+deep book and cancels, agent queries per second by class, and simulated
+days per second for populations of 1k, 10k and 100k agents.  Every case
+reports its best rate over a few repeats.
+
+    python benchmarks/bench_suite.py [--out FILE] [--compare BASELINE]
+                                     [--only PREFIX] [--quick]
+
+--out writes the results as JSON.  --compare reads a file written by
+--out, prints the change of every case against it and exits with status
+1 if any case is slower by more than --tolerance.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from pymarket.behavioral_book import initbook, setup, run_days
+from pymarket.book import OrderBook
+from pymarket.chartist import Chartist
+from pymarket.params import params
+from pymarket.smrt_money import Institution
+from pymarket.trender import Trender
+
+SEED = 0
+
+
+def best_rate(run, repeat):
+    """ The best operations per second of repeat calls to run, which
+    returns (operations, seconds).  As in timeit, the garbage collector is
+    off while run runs."""
+    rates = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            ops, seconds = run()
+        finally:
+            gc.enable()
+        rates.append(ops / seconds)
+    return max(rates)
+
+
+def limit_orders(n, rng):
+    """ n non-crossing limit orders around 10000 ticks"""
+    sides = np.where(rng.random(n) < .5, 'B', 'S')
+    away = 10 * rng.integers(1, 50, n)
+    prices = np.where(sides == 'B', 10000 - away, 10000 + away)
+    sizes = rng.integers(100, 1000, n)
+    return list(zip(prices.tolist(), sides.tolist(), sizes.tolist()))
+
+
+def bench_limit_insert(n):
+    orders = limit_orders(n, np.random.default_rng(SEED))
+
+    def run():
+        book = OrderBook({}, {}, seed=SEED)
+        start = time.perf_counter()
+        for price, side, size in orders:
+            book.order('A', price, side, size, (1, 0))
+        return n, time.perf_counter() - start
+    return run
+
+
+def bench_market_sweep(n, levels=200, per_level=20, swept=3):
+    """ Market orders each sweeping swept levels of a deep book"""
+    rng = np.random.default_rng(SEED)
+    size = 100
+
+    def run():
+        book = OrderBook({}, {}, seed=SEED)
+        for k in range(1, levels + 1):
+            for _ in range(per_level):
+                book.order('A', 10000 - 10 * k, 'B', size, (0, 0))
+                book.order('A', 10000 + 10 * k, 'S', size, (0, 0))
+        # Refill the orders each sweep takes, at their own prices, so every
+        # market order sweeps the same swept levels
+        sides = np.where(rng.random(n) < .5, 'B', 'S').tolist()
+        elapsed = 0.
+        for i, side in enumerate(sides):
+            fills = []
+            start = time.perf_counter()
+            book.order('M', 'Market', side, swept * per_level * size,
+                       (1, i), fills)
+            elapsed += time.perf_counter() - start
+            refill = 'S' if side == 'B' else 'B'
+            for _, price, filled in fills:
+                book.order('A', price, refill, filled, (1, i))
+        return n, elapsed
+    return run
+
+
+def bench_cancel(n):
+    orders = limit_orders(n, np.random.default_rng(SEED))
+    order = np.random.default_rng(SEED + 1).permutation(n).tolist()
+
+    def run():
+        book = OrderBook({}, {}, seed=SEED)
+        ids = [book.order('A', price, side, size, (1, 0))
+               for price, side, size in orders]
+        start = time.perf_counter()
+        for i in order:
+            book.cancel(ids[i])
+        return n, time.perf_counter() - start
+    return run
+
+
+def bench_queries(cls, days):
+    """ Queries of the agents of one class, in a book with the default
+    population"""
+    def run():
+        state = setup(seed=SEED)
+        book = state['book']
+        agents = [agent for agent in book.Agents.values()
+                  if type(agent) is cls]
+        elapsed = 0.
+        for day in range(days):
+            run_days(state, day + 1, verbose=False)
+            start = time.perf_counter()
+            for agent in agents:
+                agent.query_agent()
+            elapsed += time.perf_counter() - start
+        return len(agents) * days, elapsed
+    return run
+
+
+def scaled_params(agents):
+    """ params with the default mix of agent classes scaled to agents"""
+    scaled = dict(params)
+    total = float(params['num_chart'] + params['num_inst'] +
+                  params['num_chart2'])
+    for key in ('num_inst', 'num_chart2'):
+        scaled[key] = int(round(params[key] * agents / total))
+    scaled['num_chart'] = agents - scaled['num_inst'] - scaled['num_chart2']
+    return scaled
+
+
+def bench_days(agents, engine, days, warmup=2):
+    """ Simulated days of a population of agents, after warmup days.  The
+    initial book is deepened in proportion to the population."""
+    scaled = scaled_params(agents)
+
+    def run():
+        state = setup(seed=SEED, engine=engine, params=scaled)
+        extra = 400 * max(agents // 370 - 1, 0)
+        if extra:
+            initbook(state['book'], extra, extra)
+        run_days(state, warmup, verbose=False)
+        start = time.perf_counter()
+        run_days(state, warmup + days, verbose=False)
+        return days, time.perf_counter() - start
+    return run
+
+
+def cases(quick):
+    """ (name, unit, run, repeat) of every benchmark"""
+    scale = 10 if quick else 1
+    out = [
+        ('book.limit_insert', 'orders/s', bench_limit_insert(100000 // scale),
+         3),
+        ('book.market_sweep', 'orders/s', bench_market_sweep(5000 // scale),
+         3),
+        ('book.cancel', 'orders/s', bench_cancel(100000 // scale), 3),
+    ]
+    for cls in (Chartist, Institution, Trender):
+        out.append(('query.' + cls.__name__, 'queries/s',
+                    bench_queries(cls, 10 // scale or 1), 3))
+    for agents in (1000, 10000, 100000):
+        for engine in ('arrays', 'objects'):
+            days = max(20 * 1000 // agents // scale, 1)
+            out.append(('days.{0}.{1}k'.format(engine, agents // 1000),
+                        'days/s', bench_days(agents, engine, days),
+                        1 if agents >= 10000 else 3))
+    return out
+
+
+def compare(results, baseline, tolerance):
+    """ Prints the change of every case against baseline and returns the
+    names of the cases slower by more than tolerance"""
+    slower = []
+    print('{0:<24} {1:>14} {2:>14} {3:>8}'.format(
+        'case', 'baseline', 'current', 'change'))
+    for name, result in results.items():
+        if name not in baseline:
+            print('{0:<24} {1:>14} {2:>14.1f}'.format(name, '-',
+                                                     result['value']))
+            continue
+        before = baseline[name]['value']
+        change = result['value'] / before - 1
+        flag = ''
+        if change < -tolerance:
+            flag = '  slower'
+            slower.append(name)
+        print('{0:<24} {1:>14.1f} {2:>14.1f} {3:>+7.1%}{4}'.format(
+            name, before, result['value'], change, flag))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='a results file to compare with')
+    parser.add_argument('--tolerance', type=float, default=.1,
+                        help='slowdown that counts as a regression')
+    parser.add_argument('--only', default='',
+                        help='only run the cases starting with this')
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller cases, for a quick check')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, unit, run, repeat in cases(args.quick):
+        if not name.startswith(args.only):
+            continue
+        value = best_rate(run, repeat)
+        results[name] = {'value': value, 'unit': unit}
+        print('{0:<24} {1:>14.1f} {2}'.format(name, value, unit))
+        sys.stdout.flush()
+    if args.out is not None:
+        meta = {'python': platform.python_version(),
+                'numpy': np.__version__, 'machine': platform.machine(),
+                'quick': args.quick, 'seed': SEED, 'time': time.time()}
+        with open(args.out, 'w') as out:
+            json.dump({'meta': meta, 'results': results}, out, indent=1,
+                      sort_keys=True)
+    if args.compare is not None:
+        with open(args.compare) as base:
+            baseline = json.load(base)['results']
+        print('')
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,9 @@
+"""
+pymarket, a module for simulating stock markets.
+
+The simulation is split into modules that can be imported on their own:
+book for the order book, behavioral_book for the agents' market and its
+Results, montecarlo and sweep for many runs.  Importing the package
+imports none of them, and plotting only imports matplotlib when a plot
+is made.  python -m pymarket runs replications from the command line.
+"""
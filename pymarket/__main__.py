@@ -0,0 +1,77 @@
+"""
+Command line entry point, python -m pymarket.
+
+Runs replications of behavioral_book.go over a process pool and prints
+the mean observed price every few days.  The mean and quantile series
+can be saved to an .npz file, or plotted.  With --profile, one
+replication is run in this process with an instrument.Profiler instead.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m pymarket',
+        description='Runs Monte Carlo replications of the order book '
+                    'market.')
+    parser.add_argument('-n', '--replications', type=int, default=20,
+                        help='number of replications (default 20)')
+    parser.add_argument('--engine', choices=('objects', 'arrays'),
+                        default='objects',
+                        help='simulate agents as objects or as arrays')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='root seed of the replications')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: CPUs)')
+    parser.add_argument('--every', type=int, default=50,
+                        help='print the mean price every this many days')
+    parser.add_argument('--out', default=None,
+                        help='save the mean and quantile series to this '
+                             '.npz file')
+    parser.add_argument('--plot', action='store_true',
+                        help='plot the mean series')
+    parser.add_argument('--profile', metavar='METRICS', default=None,
+                        help='profile one replication in this process, '
+                             'print the report and append the metrics to '
+                             'this file')
+    args = parser.parse_args(argv)
+
+    if args.profile is not None:
+        from .behavioral_book import go
+        from .instrument import Profiler
+        with Profiler() as profiler:
+            go(0, seed=args.seed, engine=args.engine, verbose=False)
+        print(profiler.report())
+        profiler.dump(args.profile, engine=args.engine, seed=args.seed)
+        return
+
+    from .montecarlo import SERIES, run_replications
+    from .params import params
+
+    def progress(i, result):
+        sys.stderr.write('replication {0} done\n'.format(i))
+
+    summary = run_replications(args.replications, params, args.workers,
+                               args.seed, args.engine, callback=progress)
+    mean = summary.mean
+    prices = mean[SERIES.index('daily_prices')]
+    for day in range(0, len(prices), args.every):
+        print('day {0:>4}  price {1:8.3f}'.format(day, prices[day]))
+    if args.out is not None:
+        arrays = dict(zip(SERIES, mean))
+        for p, series in summary.quantiles.items():
+            for name, values in zip(SERIES, series):
+                arrays['{0}_q{1:g}'.format(name, p)] = values
+        np.savez(args.out, **arrays)
+    if args.plot:
+        from matplotlib import pyplot as plt
+        from .behavioral_book import make_plots
+        make_plots(mean)
+        plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,506 @@
+"""
+JG's modification of GP's Order Book.
+"""
+
+import numpy as np
+from .book import OrderBook
+from .chartist import Chartist
+from .smrt_money import Institution
+from .trender import Trender as Chartist2
+from .params import params
+from .population import Population
+from .tape import TapeReader, TapeWriter
+from .scheduler import EventScheduler
+from .ticks import to_ticks, to_price
+from .randpool import RandomPool
+from . import snapshot
+from .observers import Pipeline, Closes, ClassVolume
+
+def depth_profile(profile, levels, scale=5.):
+    """ The probability of an initial order going to each price level
+
+    Parameters
+    ----------
+
+    profile : str or array
+        'flat' for the same probability at every level, 'exponential' for
+        a probability decaying with the distance from the price, or the
+        relative weight of every level, nearest the price first, for an
+        empirical shape.
+
+    levels : int
+        Number of price levels.  Ignored if profile is an array.
+
+    scale : float
+        Number of levels over which an exponential profile decays by e
+
+    Returns
+    -------
+
+    weights : array
+        The probabilities, nearest the price first
+    """
+    if isinstance(profile, str):
+        if profile == 'flat':
+            weights = np.ones(levels)
+        elif profile == 'exponential':
+            weights = np.exp(-np.arange(levels) / float(scale))
+        else:
+            raise ValueError('Unknown depth profile {0!r}'.format(profile))
+    else:
+        weights = np.asarray(profile, dtype=float)
+    if len(weights) == 0 or (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError('A depth profile needs non-negative weights with a '
+                         'positive sum')
+    return weights / weights.sum()
+
+
+def initbook(abook, numbids=400, numasks=400, profile='flat', levels=25,
+             spacing=20, sizes=np.arange(5000, 20000, 2000)):
+    """ Puts some orders around the starting price of
+       an order book.
+
+    All the levels and sizes are drawn at once, and the orders go in with
+    one OrderBook.submit_batch call.
+
+    Parameters
+    ----------
+
+    abook : OrderBook instance
+
+    numbids, numasks : int
+        Number of bids and asks
+
+    profile : str or array
+        How the orders spread over the levels, see depth_profile
+
+    levels : int
+        Number of price levels on each side
+
+    spacing : int
+        Ticks between levels.  The nearest levels are spacing ticks away
+        from the price.
+
+    sizes : array
+        The sizes an order is drawn from, uniformly
+       """
+    rng = abook.rng.generator
+    price = to_ticks(int(abook.price))
+    weights = depth_profile(profile, levels)
+    away = spacing * (1 + rng.choice(len(weights), numbids + numasks,
+                                     p=weights))
+    size = sizes[rng.integers(0, len(sizes), numbids + numasks)]
+    prices = np.concatenate([price - away[:numbids], price + away[numbids:]])
+    sides = np.array(['B'] * numbids + ['S'] * numasks)
+    abook.submit_batch(['Me'] * len(prices), prices, sides, size,
+                       np.zeros((len(prices), 2), dtype=int))
+    return 'Book Filled'
+
+
+
+
+
+
+
+# Agent class codes of the Results columns
+CHART = 0
+INST = 1
+CHART2 = 2
+
+
+def agent_class(agentid):
+    """ The class code of an agent id.  Institutions start with 'I',
+    extrapolating traders with 'C2-' and everything else, including the
+    initial orders, counts as a chartist."""
+    if agentid[0] == 'I':
+        return INST
+    elif agentid[:3] == 'C2-':
+        return CHART2
+    return CHART
+
+
+class Results(object):
+    """
+    Summaries of a finished run.
+
+    The columns of the transaction log are read once, and every summary
+    is a vectorized group-by over those columns.  Both the columns and the
+    summaries are cached, so build Results once the run is over.
+
+    With a tape, daily reads the daily closes and volumes from the
+    memory-mapped tape instead, so they can be summarized for runs whose
+    log does not fit in memory.
+
+    Parameters
+    ----------
+
+    Book : OrderBook instance
+        The order book of the run
+
+    tape : str
+        The path of the run's tape, see go
+
+    nagents : int
+        The number of agents of the run.  Defaults to the agents registered
+        in the book, which a Population's agents are not, so give it for
+        runs of the 'arrays' engine.
+    """
+    def __init__(self, Book, tape=None, nagents=None):
+        self.Book = Book
+        self.tape = tape
+        self.nagents = nagents
+        self._columns = None
+        self._cache = {}
+
+    def daily(self):
+        """ The closes and the volume by agent class of every day, from the
+        tape, see tape.TapeReader.daily
+
+        Returns
+        -------
+
+        days : array
+            Every day from the first to the last day with a trade
+
+        closes : array
+            The last price traded each day in dollars, carried over days
+            without trades
+
+        volume : array
+            Shares traded each day by the class of the resting order's
+            agent, shape (3, number of days) for CHART, INST and CHART2.
+            The tape does not record who sent a market order, so unlike
+            inst_chart_vol, which also counts the sender's side of every
+            trade from the transaction log, each share traded is counted
+            once.
+        """
+        if self.tape is None:
+            raise ValueError('Results has no tape')
+        if 'daily' not in self._cache:
+            days, closes, volume = TapeReader(self.tape).daily(agent_class)
+            if volume.shape[0] < 3:
+                volume = np.vstack([volume, np.zeros(
+                    (3 - volume.shape[0], volume.shape[1]))])
+            self._cache['daily'] = days, closes, volume
+        return self._cache['daily']
+
+    def columns(self):
+        """ The transaction log as columns
+
+        Returns
+        -------
+
+        columns : dict
+            'days' is the days of the log in order.  The other entries have
+            one element per transaction: 'day' (index into days of the day
+            it was logged under), 'agent' (class code), 'price' (in
+            dollars), 'size',
+            'tday' and 'second' (the time of the order), and 'side' (1 for
+            'B', -1 for 'S').
+        """
+        if self._columns is None:
+            log = self.Book.transactions
+            records = log.records
+            classes = np.array([agent_class(agentid)
+                                for agentid in log.agentids], dtype=np.int8)
+            self._columns = {
+                'days': log.days,
+                'day': np.repeat(np.arange(len(log)), np.diff(log.offsets)),
+                'agent': classes[records['agent']],
+                'price': to_price(records['price']),
+                'size': records['size'],
+                'tday': records['tday'],
+                'second': records['second'],
+                'side': records['side']}
+        return self._columns
+
+    def _by_day(self, weights):
+        """ Sums weights over the transactions of each day"""
+        columns = self.columns()
+        return np.bincount(columns['day'], weights=weights,
+                           minlength=len(columns['days']))
+
+    def get_tickets(self):
+        if 'tickets' not in self._cache:
+            columns = self.columns()
+            counts = np.bincount(columns['day'],
+                                 minlength=len(columns['days']))
+            last = np.cumsum(counts) - 1
+            end_trade = np.full(len(counts), float(self.Book.price))
+            traded = counts > 0
+            end_trade[traded] = columns['price'][last[traded]]
+            self._cache['tickets'] = (columns['price'], end_trade)
+        return self._cache['tickets']
+
+    def intraday(self, day):
+        return self.columns()['price'][self.Book.transactions.day_slice(day)]
+
+    def inst_chart_vol(self):
+        if 'inst_chart_vol' not in self._cache:
+            columns = self.columns()
+            self._cache['inst_chart_vol'] = tuple(
+                self._by_day(columns['size'] * (columns['agent'] == code))
+                for code in (CHART, INST, CHART2))
+        return self._cache['inst_chart_vol']
+
+    def get_x_axis(self):
+        if 'x_axis' not in self._cache:
+            columns = self.columns()
+            nagents = self.nagents
+            if nagents is None:
+                nagents = len(self.Book.Agents)
+            if not nagents > 0:
+                raise ValueError('The run has no agents, give Results '
+                                 'nagents')
+            nagents = float(nagents)
+            times = (columns['tday'] - 1) * nagents + columns['second']
+            self._cache['x_axis'] = times / nagents
+        return self._cache['x_axis']
+
+    def buy_sell_vol(self):
+        if 'buy_sell_vol' not in self._cache:
+            columns = self.columns()
+            directed = columns['size'] * columns['side']
+            self._cache['buy_sell_vol'] = tuple(
+                self._by_day(directed * (columns['agent'] == code))
+                for code in (CHART, INST, CHART2))
+        return self._cache['buy_sell_vol']
+
+    def n_day_returns(self, n):
+        prices = np.asarray(self.get_tickets()[1])
+        nret = (prices[n :] - prices[:-n]) / prices[:-n]
+        return nret
+
+def setup(seed=None, engine='objects', params=params, tape=None,
+          arrivals=None, ladder='heap', l2=None, matching='python'):
+    """ Builds the book and the agents of a replication, see go for the
+    arguments
+
+    Returns
+    -------
+
+    state : dict
+        'book' the OrderBook, 'engine', 'population' the Population or
+        None, 'scheduler' the EventScheduler or None, 'pipeline' the
+        observers.Pipeline or None, 'trueps' the fundamental values so far
+        and 'day' the number of days run.  It
+        can be saved and restored with snapshot.dumps and snapshot.loads.
+    """
+    if arrivals is not None and engine != 'objects':
+        raise ValueError("arrivals needs engine='objects', a Population "
+                         "is queried once a day")
+    the_book = OrderBook({}, {}, vol=params['fund_vol'], seed=seed,
+                         tape=TapeWriter(tape) if tape is not None else None,
+                         ladder=ladder, l2=l2, matching=matching)
+    rng = the_book.rng.generator
+    initbook(the_book)
+    population = None
+    if engine == 'arrays':
+        population = Population.from_params(the_book, params)
+    for chart in range(params['num_chart'] if engine == 'objects' else 0):
+        Chartist(the_book, params['phi'](rng, params['philims']),
+                 params['rho'](rng, params['rholims']), params['muchart'](rng),
+                 params['psi'](rng), params['Sigmachart'](rng), 'C'+str(chart),
+                 params['delta'](rng, (params['deltalimsc'][0], params['deltalimsc'][1])),
+                 params['beta'](rng, (params['betalims'][0],params['betalims'][1])),
+                 initval = rng.uniform(99, 101))
+    for inst in range(params['num_inst'] if engine == 'objects' else 0):
+        Institution(the_book, phi = params['phi'](rng, params['philims']),
+                    rho=params['rho'](rng, params['rholims']),
+                    mu=params['muinst'](rng),
+                 psi=params['psi'](rng), Sigma=params['Sigmainst'](rng), agentid='I'+str(inst),
+                 delta=params['delta'](rng, params['deltalimsi']), initval=100)
+    for chart in range(params['num_chart2'] if engine == 'objects' else 0):
+        Chartist2(the_book, params['phi'](rng, params['philims']),
+                 params['rho'](rng, params['rholims']), params['muchart'](rng),
+                 params['psi'](rng), params['Sigmachart'](rng), 'C2-'+str(chart),
+                 params['delta'](rng, (1, 2)),
+                 params['beta'](rng, (params['betalims'][0],params['betalims'][1])),
+                 initval = rng.uniform(99, 101), horizon = int(params['horizon'](rng)))
+
+    scheduler = None
+    if arrivals is not None:
+        scheduler = EventScheduler(the_book, the_book.Agents.values(),
+                                   rate=arrivals)
+    the_book.truep=100
+    return {'book': the_book, 'engine': engine, 'population': population,
+            'scheduler': scheduler, 'pipeline': None,
+            'trueps': [the_book.truep], 'day': 0}
+
+
+def run_days(state, days, shock=3., verbose=True):
+    """ Runs a replication on until days days have been run in total.
+    shock is added to the fundamental value on day 200.  If the state has
+    a pipeline, it observes every day as it closes."""
+    the_book = state['book']
+    rng = the_book.rng.generator
+    population = state['population']
+    scheduler = state['scheduler']
+    pipeline = state.get('pipeline')
+    trueps = state['trueps']
+    for day in range(state['day'], days):
+
+        next(the_book.move())
+        # if int(day)/40 * 40==day:
+        #     the_book.truep +=4
+        # if int(day)/80 * 80 == day:
+        #     the_book.truep -=8
+        trueps.append(the_book.truep)
+        if day == 200:
+           the_book.truep += shock
+        the_book.second=0
+        next(the_book.day_tick())
+        if verbose:
+            print('The day:', day)
+            print('Observed Price', the_book.price)
+            print('True Price', the_book.truep)
+        the_book.transactions.start_day(the_book.day)
+        if population is not None:
+            population.query()
+        elif scheduler is not None:
+            scheduler.run_day()
+        else:
+            agent_order = rng.permutation(list(the_book.Agents.values()))
+            for agnt in agent_order:
+                agnt.query_agent()
+        the_book.close_day()
+        if pipeline is not None:
+            pipeline.observe(the_book)
+        state['day'] = day + 1
+    return state
+
+
+def warm_start(days=200, seed=None, engine='objects', params=params,
+               arrivals=None, ladder='heap', verbose=False, l2=None,
+               matching='python'):
+    """ Runs the first days of a replication, the burn-in before the shock,
+    and returns a snapshot of it that go can start from"""
+    state = setup(seed, engine, params, arrivals=arrivals, ladder=ladder,
+                  l2=l2, matching=matching)
+    return snapshot.dumps(run_days(state, days, verbose=verbose))
+
+
+def _check_start(state, engine, arrivals, ladder, matching):
+    """ Raises ValueError if the arguments given to go along with a
+    snapshot differ from the snapshot's"""
+    book = state['book']
+    snapped = {'engine': state['engine'],
+               'ladder': 'dense' if book._dense else 'heap',
+               'matching': 'kernel' if book._kernel else 'python'}
+    given = {'engine': engine, 'ladder': ladder, 'matching': matching}
+    for name in sorted(given):
+        if given[name] is not None and given[name] != snapped[name]:
+            raise ValueError('The snapshot has {0}={1!r}, not {2!r}'.format(
+                name, snapped[name], given[name]))
+    scheduler = state['scheduler']
+    rate = None if scheduler is None else np.asarray(scheduler.rate)
+    if arrivals is not None and not (
+            rate is not None and np.shape(arrivals) in ((), rate.shape) and
+            np.all(rate == arrivals)):
+        raise ValueError('The snapshot was not taken with these arrivals')
+
+
+def go(i, seed=None, engine=None, params=params, verbose=True,
+       tape=None, arrivals=None, ladder=None, start=None, shock=3.,
+       observers=None, discard=False, l2=None, matching=None):
+    """ Runs one replication of the simulation.  All random draws come from
+    the book's random pool, so the same seed gives the same run.
+
+    engine is 'objects', the default, to simulate every agent as a Trader
+    instance, or 'arrays' to simulate them as a Population.  params defaults to the
+    module's params, and verbose prints the prices every day.  If tape is
+    a path, the book's trades, orders and cancellations are written to a
+    tape there, see tape.TapeReader.  If arrivals is given, the Trader
+    objects are queried at Poisson arrival times at that rate per day,
+    see scheduler.EventScheduler, instead of once a day each.  ladder
+    picks the book's price ladder, 'heap' (the default) or 'dense', and
+    matching how market orders are matched, 'python' (the default) or
+    'kernel', see OrderBook.  If
+    l2 is an l2.L2Stream, the book records snapshots of its top levels to
+    it.  shock is added to the fundamental value on day 200.
+
+    If start is a snapshot, from warm_start or snapshot.dumps, the run
+    carries on from it instead of building a new book, and engine,
+    arrivals, ladder and matching are those of the snapshot.  Giving
+    different ones raises ValueError.  For a snapshot saved
+    with snapshot.save, pass snapshot.dumps(snapshot.load(path)).  A seed then reseeds
+    the book's random pool, so forks of one snapshot can differ, and a
+    tape or an l2 stream only holds the days after the snapshot.
+
+    observers are observers.Observer instances that see every day's
+    trades as the day closes, see observers.Pipeline.  If discard is true,
+    the trades are dropped after each day so memory does not grow with
+    the length of the run.  The series returned are then accumulated
+    day by day, and days without trades close at the last price traded
+    before them rather than at the final price of the run.  A run started
+    from a snapshot is only observed from the snapshot on."""
+    if start is None:
+        state = setup(seed, engine or 'objects', params, tape, arrivals,
+                      ladder or 'heap', l2, matching or 'python')
+    else:
+        state = snapshot.loads(start)
+        _check_start(state, engine, arrivals, ladder, matching)
+        if seed is not None:
+            state['book'].rng = RandomPool(seed)
+        if tape is not None:
+            state['book'].tape = TapeWriter(tape)
+        if l2 is not None:
+            state['book'].l2 = l2
+    observers = list(observers or ())
+    if discard:
+        closes, volume = Closes(), ClassVolume()
+        observers += [closes, volume]
+    if observers:
+        state['pipeline'] = Pipeline(observers, agent_class, discard)
+    run_days(state, 600, shock, verbose)
+    the_book = state['book']
+    if the_book.tape is not None:
+        the_book.tape.close()
+    if discard:
+        if verbose:
+            print(str(i)*10)
+        return (np.array(closes.closes),) + \
+            tuple(np.array(series) for series in volume.directed) + \
+            tuple(np.array(series) for series in volume.undirected) + \
+            (state['trueps'][1:],)
+    population = state['population']
+    res = Results(the_book, tape,
+                  None if population is None else len(population))
+    daily_prices = res.get_tickets()[1]
+    chart_vol_directed, inst_vol_directed, chart2_vol_directed = \
+        res.buy_sell_vol()
+    chart_vol_und, inst_vol_und, chart2_vol_und = res.inst_chart_vol()
+    if verbose:
+        print(str(i)*10)
+    return daily_prices, chart_vol_directed, inst_vol_directed, chart2_vol_directed, chart_vol_und, inst_vol_und, chart2_vol_und, state['trueps'][1:]
+
+
+#daily_prices, chart_vol_directed, inst_vol_directed, chart2_vol_directed, chart_vol_und, inst_vol_und, chart2_vol_und = go()
+
+def make_plots(meandata):
+    # matplotlib is only needed for plotting, so it is not imported with
+    # the module
+    from matplotlib import pyplot as plt
+    fig, ((ax1, ax2, ax3), (ax5, ax6, ax7)) = plt.subplots(2,3)
+    cross = np.argmax(np.asarray(meandata[0]) >103)
+    # ax1.set_title('Observed Price')
+    ax1.plot(np.asarray(meandata[2]))
+    ax1.set_title('Net Volume of Institutions')
+    ax5.plot(meandata[5])
+    ax5.set_title('Total institutional volume')
+    ax2.plot(meandata[1])
+    ax2.set_title('Net Volume of Anchor Traders')
+    ax6.plot(meandata[4])
+    ax6.set_title('Total Volume of Anchor Traders')
+    ax3.plot(meandata[3])
+    ax3.set_title('Net volume of Extrapolate Trader ')
+    ax7.plot(meandata[6])
+    ax7.set_title('Total Volume of Extrapolate Trader')
+    plt.figure(111)
+    plt.plot(np.arange(len(meandata[0])), meandata[0])
+    plt.title('Observed Price')
+    plt.hlines(103, 0, 400)
+    plt.vlines(cross, 100, 103)
+    allax = [ax1, ax2, ax3, ax5, ax6, ax7]
+    for ax in allax:
+        ax.vlines(cross, ax.get_ylim()[0], ax.get_ylim()[1])
@@ -0,0 +1,1279 @@
+import numpy as np
+from heapq import heappush, heappop, heapify
+from .randpool import RandomPool
+from .translog import TransactionLog, BUY, SELL
+from .tape import TRADE, PLACE, CANCEL
+from .ticks import to_ticks, to_price
+
+# One fill of a batch: the index of the market order in the batch, the id
+# of the resting order it hit, the price traded in ticks and the size
+FILL_DTYPE = np.dtype([('index', np.int64), ('order_id', np.int64),
+                       ('price', np.int64), ('size', np.float64)])
+
+# One price level of the book: the price in ticks and the aggregate size
+# resting at it
+DEPTH_DTYPE = np.dtype([('price', np.int64), ('size', np.float64)])
+
+
+class Order(object):
+    """
+    A resting limit order.  The order carries its own links to its
+    neighbours at the same price, so it can be unlinked from its
+    OrderQueue without searching the level.
+
+    Parameters
+    ----------
+
+    price : int
+        The limit price in ticks
+
+    size : int
+        Number of shares left to trade
+
+    time : tuple
+        The time the order was placed in the form of (day, second)
+
+    agentid : str
+        The id of the agent that placed the order
+
+    order_id : int
+        The id the book assigned to the order
+    """
+    __slots__ = ('price', 'size', 'time', 'agentid', 'order_id',
+                 'prev', 'next')
+
+    def __init__(self, price, size, time, agentid, order_id):
+        self.price = price
+        self.size = size
+        self.time = time
+        self.agentid = agentid
+        self.order_id = order_id
+        self.prev = None
+        self.next = None
+
+    def __repr__(self):
+        return 'Order({0}, {1}, {2}, {3}, {4})'.format(
+            self.price, self.size, self.time, self.agentid, self.order_id)
+
+    def __reduce__(self):
+        # The links are rebuilt by OrderQueue, pickling them would recurse
+        # down the whole queue
+        return (Order, (self.price, self.size, self.time, self.agentid,
+                        self.order_id))
+
+
+class OrderQueue(object):
+    """
+    The orders resting at one price, oldest first.  A doubly linked list
+    threaded through the Order instances, so appending, popping the oldest
+    order and removing any order are all O(1).
+
+    Attributes
+    ----------
+
+    size : float
+        The aggregate size of the orders in the queue.  Kept up to date
+        when orders are added and removed, and by the book when an order
+        is partly filled.
+    """
+    __slots__ = ('head', 'tail', '_len', 'size')
+
+    def __init__(self):
+        self.head = None
+        self.tail = None
+        self._len = 0
+        self.size = 0
+
+    def __len__(self):
+        return self._len
+
+    def __reduce__(self):
+        return (_order_queue, (list(self),))
+
+    def __iter__(self):
+        order = self.head
+        while order is not None:
+            yield order
+            order = order.next
+
+    def append(self, order):
+        """ Adds an order to the back of the queue"""
+        order.prev = self.tail
+        order.next = None
+        if self.tail is None:
+            self.head = order
+        else:
+            self.tail.next = order
+        self.tail = order
+        self._len += 1
+        self.size += order.size
+
+    def popleft(self):
+        """ Removes and returns the oldest order"""
+        order = self.head
+        self.remove(order)
+        return order
+
+    def remove(self, order):
+        """ Unlinks an order from the queue"""
+        if order.prev is None:
+            self.head = order.next
+        else:
+            order.prev.next = order.next
+        if order.next is None:
+            self.tail = order.prev
+        else:
+            order.next.prev = order.prev
+        order.prev = order.next = None
+        self._len -= 1
+        self.size -= order.size
+
+
+def _order_queue(orders):
+    """ Rebuilds a pickled OrderQueue"""
+    queue = OrderQueue()
+    for order in orders:
+        queue.append(order)
+    return queue
+
+
+class PriceLevels(dict):
+    """
+    One side of the order book.  Keys are prices in ticks, values are the
+    OrderQueue of orders resting at that price.
+
+    Alongside the dict, a heap of the populated prices is kept so the best
+    price is always at the top.  Reading the best price is O(1), adding or
+    removing a price level is O(log n).  Removed prices are dropped from
+    the heap lazily, only once they reach the top.
+
+    Parameters
+    ----------
+
+    side : str
+        "B" for the bid side (best is the highest price), "S" for the ask
+        side (best is the lowest price).
+
+    levels : dict
+        Initial price levels.
+    """
+    def __init__(self, side, levels=()):
+        super(PriceLevels, self).__init__()
+        self.side = side
+        self._sign = -1 if side == 'B' else 1
+        self._heap = []
+        self.update(levels)
+
+    def __reduce__(self):
+        return (PriceLevels, (self.side, dict(self)))
+
+    def __setitem__(self, price, orders):
+        new = price not in self
+        super(PriceLevels, self).__setitem__(price, orders)
+        if new:
+            heappush(self._heap, self._sign * price)
+            if len(self._heap) > 2 * len(self) + 64:
+                self._compact()
+
+    def __delitem__(self, price):
+        super(PriceLevels, self).__delitem__(price)
+        self._clean()
+
+    def pop(self, price, *default):
+        orders = super(PriceLevels, self).pop(price, *default)
+        self._clean()
+        return orders
+
+    def popitem(self):
+        item = super(PriceLevels, self).popitem()
+        self._clean()
+        return item
+
+    def setdefault(self, price, orders=None):
+        if price not in self:
+            self[price] = orders
+        return super(PriceLevels, self).__getitem__(price)
+
+    def update(self, *args, **kwargs):
+        for price, orders in dict(*args, **kwargs).items():
+            self[price] = orders
+
+    def clear(self):
+        super(PriceLevels, self).clear()
+        self._heap = []
+
+    def best(self):
+        """ The best price on this side of the book"""
+        if not self:
+            raise ValueError('No orders on the {0} side'.format(self.side))
+        return self._sign * self._heap[0]
+
+    def size_at(self, price):
+        """ The aggregate size resting at a populated price"""
+        return self[price].size
+
+    def volume(self):
+        """ The aggregate size resting on this side"""
+        return sum(level.size for level in self.values())
+
+    def covers(self, size):
+        """ Whether the orders resting on this side add up to size or more.
+        Only the best levels needed are summed."""
+        total = 0
+        for price in self._walk():
+            total += self[price].size
+            if total >= size:
+                return True
+        return total >= size
+
+    def top(self, n):
+        """ The n best prices, best first, or all of them if there are
+        fewer"""
+        prices = []
+        if n > 0:
+            for price in self._walk():
+                prices.append(price)
+                if len(prices) == n:
+                    break
+        return prices
+
+    def _walk(self):
+        """ Yields the populated prices, best first
+
+        The heap is walked from its root with a second, small heap holding
+        the frontier of entries not visited yet: popping its smallest key
+        and pushing that entry's two children yields the keys in order, so
+        only about as many entries of the heap are looked at as prices are
+        taken.
+        """
+        heap = self._heap
+        sign = self._sign
+        last = None
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            key, i = heappop(frontier)
+            price = sign * key
+            # Removed prices linger in the heap, and a price can be in it
+            # twice if it was removed and added back
+            if price in self and price != last:
+                last = price
+                yield price
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heappush(frontier, (heap[child], child))
+
+    def _clean(self):
+        """ Pops removed prices off the top of the heap"""
+        heap = self._heap
+        sign = self._sign
+        while heap and sign * heap[0] not in self:
+            heappop(heap)
+
+    def _compact(self):
+        """ Rebuilds the heap from the populated prices only"""
+        self._heap = [self._sign * price for price in self]
+        heapify(self._heap)
+
+
+class DenseLevels(object):
+    """
+    One side of the order book, stored in arrays.  Like PriceLevels, it
+    maps the populated prices in ticks to their orders and tracks the best
+    price, but nothing on it is a Python object per order.
+
+    The price levels are indexed by price - base, in a window of width
+    ticks.  For every tick, depth holds the aggregate size resting there,
+    count the number of orders and head and tail the first and last of
+    them.  The orders are slots of the order arrays: sizes, order_ids,
+    tdays and seconds (the time placed), agentids, and next and prev,
+    which link the orders of a level oldest first.  Matching runs over
+    these arrays in kernel.match, see OrderBook.
+
+    The index of the best level is tracked and, when it empties, found
+    again by walking count towards worse prices.  The aggregate size of
+    the whole side is kept as a running total.  When a price outside the
+    window is added, the window is moved to center the populated levels,
+    and doubled if they do not fit, up to max_width ticks.  Adding a price
+    that cannot fit raises ValueError.
+
+    Parameters
+    ----------
+
+    side : str
+        "B" for the bid side (best is the highest price), "S" for the ask
+        side (best is the lowest price).
+
+    center : int
+        The price in ticks the window starts centered on
+
+    width : int
+        Number of ticks in the window at first
+
+    max_width : int
+        Number of ticks the window can grow to
+
+    capacity : int
+        Number of order slots at first.  The order arrays double when they
+        are full.
+
+    Attributes
+    ----------
+
+    base : int
+        The price in ticks of the first element of the level arrays
+
+    depth : array
+        The aggregate size resting at each tick of the window
+    """
+    def __init__(self, side, center=10000, width=2048, max_width=1 << 16,
+                 capacity=1024):
+        self.side = side
+        self._bid = side == 'B'
+        self._width = width
+        self.max_width = max(width, max_width)
+        self.base = center - width // 2
+        self.depth = np.zeros(width)
+        self.count = np.zeros(width, dtype=np.int64)
+        self.head = np.full(width, -1, dtype=np.int64)
+        self.tail = np.full(width, -1, dtype=np.int64)
+        self.sizes = np.zeros(capacity)
+        self.order_ids = np.zeros(capacity, dtype=np.int64)
+        self.tdays = np.zeros(capacity, dtype=np.int64)
+        self.seconds = np.zeros(capacity, dtype=np.int64)
+        self.next = np.full(capacity, -1, dtype=np.int64)
+        self.prev = np.full(capacity, -1, dtype=np.int64)
+        self.agentids = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._len = 0
+        self._best = -1
+        self._volume = 0.
+
+    def __len__(self):
+        """ Number of populated price levels"""
+        return self._len
+
+    def __contains__(self, price):
+        i = price - self.base
+        return 0 <= i < self._width and self.count[i] > 0
+
+    def __iter__(self):
+        """ The populated prices, lowest first"""
+        return iter((np.flatnonzero(self.count) + self.base).tolist())
+
+    def best(self):
+        """ The best price on this side of the book"""
+        if self._best < 0:
+            raise ValueError('No orders on the {0} side'.format(self.side))
+        return self.base + self._best
+
+    def top(self, n):
+        """ The n best prices, best first, or all of them if there are
+        fewer.  Only the ticks from the best price to the n-th are
+        scanned, a chunk at a time."""
+        best = self._best
+        if best < 0 or n <= 0:
+            return []
+        count = self.count
+        chunk = 32 * n
+        found = []
+        if self._bid:
+            stop = best + 1
+            while stop > 0 and len(found) < n:
+                start = max(stop - chunk, 0)
+                found.extend((np.flatnonzero(count[start:stop])[::-1] +
+                              start).tolist())
+                stop = start
+        else:
+            start = best
+            while start < self._width and len(found) < n:
+                stop = start + chunk
+                found.extend((np.flatnonzero(count[start:stop]) +
+                              start).tolist())
+                start = stop
+        base = self.base
+        return [base + i for i in found[:n]]
+
+    def size_at(self, price):
+        """ The aggregate size resting at a populated price"""
+        return float(self.depth[price - self.base])
+
+    def volume(self):
+        """ The aggregate size resting on this side"""
+        return self._volume
+
+    def covers(self, size):
+        """ Whether the orders resting on this side add up to size or
+        more"""
+        return self._volume >= size
+
+    def orders(self, price):
+        """ (order_id, size, (day, second), agentid) of the orders resting
+        at price, oldest first"""
+        i = price - self.base
+        slot = self.head[i] if 0 <= i < self._width else -1
+        out = []
+        while slot >= 0:
+            out.append((int(self.order_ids[slot]), float(self.sizes[slot]),
+                        (int(self.tdays[slot]), int(self.seconds[slot])),
+                        self.agentids[slot]))
+            slot = self.next[slot]
+        return out
+
+    def add(self, price, size, time, agentid, order_id):
+        """ Adds an order at the back of the level at price
+
+        Returns
+        -------
+
+        slot : int
+            The order's slot in the order arrays
+        """
+        i = price - self.base
+        if not 0 <= i < self._width:
+            self._recenter(price)
+            i = price - self.base
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        self.sizes[slot] = size
+        self.order_ids[slot] = order_id
+        self.tdays[slot], self.seconds[slot] = time
+        self.agentids[slot] = agentid
+        tail = int(self.tail[i])
+        self.next[slot] = -1
+        self.prev[slot] = tail
+        if tail < 0:
+            self.head[i] = slot
+            self._len += 1
+            best = self._best
+            if best < 0 or (i > best if self._bid else i < best):
+                self._best = i
+        else:
+            self.next[tail] = slot
+        self.tail[i] = slot
+        self.count[i] += 1
+        self.depth[i] += size
+        self._volume += size
+        return slot
+
+    def remove(self, price, slot):
+        """ Unlinks the order in slot from the level at price and frees the
+        slot"""
+        i = price - self.base
+        prev = self.prev[slot]
+        next = self.next[slot]
+        if prev < 0:
+            self.head[i] = next
+        else:
+            self.next[prev] = next
+        if next < 0:
+            self.tail[i] = prev
+        else:
+            self.prev[next] = prev
+        size = float(self.sizes[slot])
+        left = self.count[i] - 1
+        self.count[i] = left
+        if left == 0:
+            self.depth[i] = 0
+            self._len -= 1
+            if i == self._best:
+                self._best = self._walk(i)
+        else:
+            self.depth[i] -= size
+        self._volume = self._volume - size if self._len else 0.
+        self.agentids[slot] = None
+        self._free.append(slot)
+
+    def match(self, size, kernel):
+        """ Fills a market order of size against this side, best price
+        first and oldest order first, and unlinks the orders it exhausts.
+        Their slots are not released, see release.
+
+        Parameters
+        ----------
+
+        size : float
+            Number of shares.  This side must hold at least as many.
+
+        kernel : callable
+            kernel.match, or its Python version
+
+        Returns
+        -------
+
+        slots : list
+            The slot of every order hit, in the order they traded
+
+        prices : list
+            The price each one traded at, in ticks
+
+        fills : list
+            The size each one traded
+        """
+        size = float(size)
+        i = self._best
+        slot = int(self.head[i])
+        if self.sizes[slot] > size:
+            # The oldest order at the best price fills all of it, with the
+            # same arithmetic as the kernel
+            self.sizes[slot] = self.sizes[slot] - size
+            self.depth[i] -= size
+            self._volume -= size
+            return [slot], [self.base + i], [size]
+        n, slots, ticks, fills, emptied, best = kernel(
+            size, i, -1 if self._bid else 1, self.count,
+            self.head, self.tail, self.depth, self.sizes, self.next,
+            self.prev)
+        self._len -= emptied
+        self._best = best
+        fills = fills[:n].tolist()
+        self._volume = self._volume - sum(fills) if self._len else 0.
+        return (slots[:n].tolist(), (ticks[:n] + self.base).tolist(), fills)
+
+    def release(self, slot):
+        """ Frees an order slot"""
+        self.agentids[slot] = None
+        self._free.append(slot)
+
+    def _grow(self):
+        """ Doubles the order arrays"""
+        n = len(self.sizes)
+        for name in ('sizes', 'order_ids', 'tdays', 'seconds', 'next',
+                     'prev'):
+            old = getattr(self, name)
+            new = np.full(2 * n, -1 if name in ('next', 'prev') else 0,
+                          dtype=old.dtype)
+            new[:n] = old
+            setattr(self, name, new)
+        self.agentids.extend([None] * n)
+        self._free.extend(range(2 * n - 1, n - 1, -1))
+
+    def _walk(self, i):
+        """ The index of the best populated level past i, -1 if none.  The
+        levels are scanned a chunk at a time."""
+        count = self.count
+        if self._bid:
+            stop = i
+            while stop > 0:
+                start = max(stop - 64, 0)
+                found = np.flatnonzero(count[start:stop])
+                if len(found):
+                    return start + int(found[-1])
+                stop = start
+            return -1
+        start = i + 1
+        while start < self._width:
+            found = np.flatnonzero(count[start:start + 64])
+            if len(found):
+                return start + int(found[0])
+            start += 64
+        return -1
+
+    def _recenter(self, price):
+        """ Moves, and if needed grows, the window so it holds price and
+        every populated level"""
+        index = np.flatnonzero(self.count)
+        low, high = price, price
+        if len(index):
+            low = min(low, self.base + int(index[0]))
+            high = max(high, self.base + int(index[-1]))
+        width = self._width
+        while width < 2 * (high - low + 1):
+            width *= 2
+        if width > self.max_width:
+            raise ValueError('Price {0} does not fit in the {1} tick window '
+                             'of the {2} side'.format(price, self.max_width,
+                                                      self.side))
+        base = (low + high) // 2 - width // 2
+        shift = self.base - base
+        for name, empty in (('depth', 0), ('count', 0), ('head', -1),
+                            ('tail', -1)):
+            old = getattr(self, name)
+            new = np.full(width, empty, dtype=old.dtype)
+            new[index + shift] = old[index]
+            setattr(self, name, new)
+        if self._best >= 0:
+            self._best += shift
+        self.base = base
+        self._width = width
+
+
+# Price ladders an OrderBook can be built on
+LADDERS = {'heap': PriceLevels, 'dense': DenseLevels}
+
+# kernel.match by whether it is the compiled one, filled on first use so
+# that importing book does not import Numba
+_MATCHERS = {}
+
+
+def _matcher(compiled):
+    """ kernel.match if compiled, else kernel.match_python"""
+    if not _MATCHERS:
+        from .kernel import match, match_python
+        _MATCHERS[True] = match
+        _MATCHERS[False] = match_python
+    return _MATCHERS[compiled]
+
+
+class RollingTrend(object):
+    """
+    Least squares line through the last horizon closing prices, updated in
+    O(1) per close from running sums.  The closes are at x = 0, ...,
+    horizon - 1, oldest first.
+
+    Parameters
+    ----------
+
+    closes : list
+        The closing prices so far.  At least horizon of them.
+
+    horizon : int
+        Number of closes the line is fit on, at least 2
+
+    Attributes
+    ----------
+
+    intercept : float
+        The fitted price at the oldest close of the window
+
+    slope : float
+        The fitted change in price per day
+    """
+    # Number of updates after which the sums are recomputed, so rounding
+    # errors do not build up
+    RESYNC = 1000
+
+    def __init__(self, closes, horizon):
+        if horizon < 2:
+            raise ValueError('A trend needs a horizon of at least 2')
+        self.horizon = horizon
+        self._xbar = (horizon - 1) / 2.
+        self._sxx = horizon * (horizon ** 2 - 1) / 12.
+        self.resync(closes)
+
+    def resync(self, closes):
+        """ Recomputes the sums from the closes"""
+        window = closes[-self.horizon:]
+        self._sy = float(sum(window))
+        self._sxy = float(sum(x * y for x, y in enumerate(window)))
+        self._updates = 0
+        self._fit()
+
+    def update(self, closes):
+        """ Moves the window on by the last close.  closes already holds
+        the new close."""
+        h = self.horizon
+        dropped = closes[-h - 1]
+        added = closes[-1]
+        self._sxy += (dropped - self._sy) + (h - 1) * added
+        self._sy += added - dropped
+        self._updates += 1
+        if self._updates == self.RESYNC:
+            self.resync(closes)
+        else:
+            self._fit()
+
+    def _fit(self):
+        self.slope = (self._sxy - self._xbar * self._sy) / self._sxx
+        self.intercept = self._sy / self.horizon - self.slope * self._xbar
+
+
+class OrderBook(object):
+    """
+    Order book class
+    """
+    def __init__(self, bids, asks, vol=0, seed=None, tape=None,
+                 ladder='heap', l2=None, matching='python'):
+        """
+        Parameters
+        ----------
+
+        bids : dict
+            Keys are prices in ticks, values are a list of lists.  Each
+            element of bids are of the form [price, size, time, agentid].
+            They are placed in the book as limit orders.
+
+        asks : dict
+            Keys are prices in ticks, values are a list of lists.  Each
+            element of asks are of the form [price, size, time, agentid].
+            They are placed in the book as limit orders.
+
+
+        vol : float
+            The volatility of the fundamental value
+
+        seed : int, SeedSequence or None
+            Seed for the book's random pool
+
+        tape : TapeWriter
+            If given, every trade, limit order and cancellation is also
+            written to the tape.  Pickled copies of the book have no tape.
+
+        ladder : str
+            How each side of the book stores its price levels.  'heap' for
+            PriceLevels, a dict with a heap of the populated prices, or
+            'dense' for DenseLevels, arrays of levels indexed by tick
+            around the starting price and of the orders resting on them.
+
+        l2 : L2Stream
+            If given, snapshots of the top levels of the book are recorded
+            to it as the book's clock moves, see l2.L2Stream
+
+        matching : str
+            How market orders are matched on the dense ladder.  Both run
+            kernel.match over the ladder's arrays: 'python' as plain
+            Python, 'kernel' compiled with Numba if it is installed.  They
+            give the same fills as the heap ladder.  'kernel' needs the
+            dense ladder.
+
+        Attributes
+        ----------
+
+        second : int
+            The second of the day
+        day : int
+            The day
+
+        Agents : Dict
+            Dictionary where keys are agentid and values are agent instance
+
+        bids : PriceLevels or DenseLevels
+            The bid side of the book
+
+        asks : PriceLevels or DenseLevels
+            The ask side of the book
+
+        truep : float
+            The true price of the underlying asset
+
+        price : float
+            The price of the last trade in dollars
+
+        last : int
+            The price of the last trade in ticks
+
+        transactions : TransactionLog
+            The transactions, logged under the day they happen
+
+        vol : float
+            The volatility of the fundamental value
+
+        rng : RandomPool
+            Random numbers for the book and the agents trading in it
+
+        tape : TapeWriter
+            The tape, or None
+
+        l2 : L2Stream
+            The L2 snapshot stream, or None
+
+        """
+        self.truep = 100
+        self.last = to_ticks(100)
+        if ladder not in LADDERS:
+            raise ValueError('Unknown ladder {0!r}, expected one of {1}'.format(
+                ladder, sorted(LADDERS)))
+        if ladder == 'dense':
+            self.bids = DenseLevels('B', center=self.last)
+            self.asks = DenseLevels('S', center=self.last)
+        else:
+            self.bids = PriceLevels('B')
+            self.asks = PriceLevels('S')
+        self._dense = ladder == 'dense'
+        if matching not in ('python', 'kernel'):
+            raise ValueError('Unknown matching {0!r}, expected python or '
+                             'kernel'.format(matching))
+        if matching == 'kernel' and not self._dense:
+            raise ValueError("Kernel matching needs ladder='dense'")
+        self._kernel = matching == 'kernel'
+        self._orders = {}
+        self._last_id = 0
+        self.second = 0
+        self.day = 0
+        self.Agents = {}
+        self.transactions = TransactionLog()
+        self.vol = vol
+        self.rng = RandomPool(seed)
+        self.tape = tape
+        self.l2 = l2
+        self._close_price = [self.price] * 100
+        self._trends = {}
+        for side, levels in (('B', bids), ('S', asks)):
+            for price in levels:
+                for order in levels[price]:
+                    self._limit_order(order[3], order[0], side, order[1],
+                                      order[2])
+
+    def __getstate__(self):
+        # The tape is an open file, a copy of the book is not written to it
+        state = self.__dict__.copy()
+        state['tape'] = None
+        return state
+
+    def include_agents(self, Agent):
+        """
+        Adds an agent to the market
+
+        Parameters
+        ----------
+
+        Agent : Trader_inst
+            a Trader instance
+        """
+        self.Agents[Agent.agentid] = Agent
+
+    @property
+    def price(self):
+        return to_price(self.last)
+
+    @price.setter
+    def price(self, price):
+        self.last = to_ticks(price)
+
+    def best_bid(self):
+        """ The highest bid price in ticks"""
+        return self.bids.best()
+
+    def best_ask(self):
+        """ The lowest ask price in ticks"""
+        return self.asks.best()
+
+    def depth(self, n):
+        """ The aggregate size at the n best price levels of each side
+
+        Parameters
+        ----------
+
+        n : int
+            Number of levels
+
+        Returns
+        -------
+
+        bids, asks : array
+            DEPTH_DTYPE records of at most n levels, best first
+        """
+        sides = []
+        for levels in (self.bids, self.asks):
+            prices = levels.top(n)
+            side = np.empty(len(prices), dtype=DEPTH_DTYPE)
+            side['price'] = prices
+            side['size'] = [levels.size_at(price) for price in prices]
+            sides.append(side)
+        return sides[0], sides[1]
+
+    def close_day(self):
+        """ Records the last price as the day's close and moves the trends
+        on"""
+        if self.l2 is not None:
+            self.l2.close_day(self)
+        self._close_price.append(self.price)
+        for trend in self._trends.values():
+            trend.update(self._close_price)
+
+    def trend(self, horizon):
+        """ The least squares line through the last horizon closes
+
+        Parameters
+        ----------
+
+        horizon : int
+            Number of closes
+
+        Returns
+        -------
+
+        intercept : float
+            The fitted price at the oldest of the closes
+
+        slope : float
+            The fitted change in price per day
+            """
+        trend = self._trends.get(horizon)
+        if trend is None:
+            trend = self._trends[horizon] = RollingTrend(self._close_price,
+                                                         horizon)
+        return trend.intercept, trend.slope
+
+    def second_tick(self):
+        """ Increase the second by 1"""
+        while True:
+            self.second += 1
+            yield self.second
+
+    def day_tick(self):
+        """ Increase the day by 1"""
+        while True:
+            self.day += 1
+            yield self.day
+
+    def move(self):
+        """ Moves the fundamental value according to vol"""
+        while True:
+            if self.vol > 0:
+                self.truep += self.rng.normal(0, self.vol)
+            yield self.truep
+
+    def order(self, agentid, price, side, size, time, fills=None):
+        """ Executes and order
+
+        Parameters
+        ----------
+
+        agentid : str
+            The id of the agent
+
+        price : str or int
+            The limit price in ticks or "Market" if the order is a market
+            order
+
+        size : int
+            Number of shares
+
+        time : tuple
+            The time the order was placed in the form of (day, second)
+
+        side : str
+            "B" for buy order, "S" for sell order
+
+        fills : list
+            If given, (order_id, price, size) is appended for every resting
+            order a market order hits, with the price in ticks
+
+        Returns
+        -------
+
+        order_id : int
+            The id of the resting order if it was a limit order, None if it
+            was a market order.
+            """
+        if price == 'Market':
+            self._market_order(side, size, time, fills)
+            self.transactions.append(time[0], agentid, self.last, size, time,
+                                     BUY if side == 'B' else SELL)
+        else:
+            return self._limit_order(agentid, price, side, size, time)
+
+    def submit_batch(self, agent_ids, prices, sides, sizes, times):
+        """ Executes a batch of orders, in order, as OrderBook.order would
+
+        Parameters
+        ----------
+
+        agent_ids : sequence
+            The id of the agent of each order
+
+        prices : array
+            The limit price of each order in ticks.  Market orders are nan,
+            or 'Market' in an object array.
+
+        sides : array
+            "B" or "S", or BUY or SELL, for each order
+
+        sizes : array
+            Number of shares of each order
+
+        times : array
+            (day, second) of each order, shape (n, 2)
+
+        Returns
+        -------
+
+        fills : array
+            FILL_DTYPE records of every resting order hit by the batch's
+            market orders, in the order they traded
+
+        order_ids : array
+            The id of each limit order left resting, 0 for market orders
+            """
+        n = len(agent_ids)
+        for name, column in (('prices', prices), ('sides', sides),
+                             ('sizes', sizes), ('times', times)):
+            if len(column) != n:
+                raise ValueError('{0} has {1} entries for {2} orders'.format(
+                    name, len(column), n))
+        order_ids = np.zeros(n, dtype=np.int64)
+        fills = []
+        fill_index = []
+        limit_order = self._limit_order
+        market_order = self._market_order
+        log = self.transactions.append
+        times = np.asarray(times).reshape(n, 2).tolist()
+        for i, agentid, price, side, size, (day, second) in zip(
+                range(n), list(agent_ids), np.asarray(prices).tolist(),
+                np.asarray(sides).tolist(), np.asarray(sizes).tolist(),
+                times):
+            time = (day, second)
+            if side == BUY:
+                side = 'B'
+            elif side == SELL:
+                side = 'S'
+            if price == 'Market' or price != price:
+                start = len(fills)
+                market_order(side, size, time, fills)
+                fill_index.extend([i] * (len(fills) - start))
+                log(day, agentid, self.last, size, time,
+                    BUY if side == 'B' else SELL)
+            else:
+                order_ids[i] = limit_order(agentid, int(price), side, size,
+                                           time)
+        records = np.empty(len(fills), dtype=FILL_DTYPE)
+        if fills:
+            order_id, price, size = zip(*fills)
+            records['index'] = fill_index
+            records['order_id'] = order_id
+            records['price'] = price
+            records['size'] = size
+        return records, order_ids
+
+    def cancel(self, order_id):
+        """ Removes a resting limit order from the book
+
+        Parameters
+        ----------
+
+        order_id : int
+            The id returned by OrderBook.order when the order was placed
+
+        Returns
+        -------
+
+        order : Order
+            The cancelled order, or None if it had already been filled.
+            """
+        if self.l2 is not None:
+            self.l2.observe(self)
+        order = self.resting(order_id)
+        if order is None:
+            return None
+        side, price, held = self._orders.pop(order_id)
+        levels = self.bids if side == 'B' else self.asks
+        if self._dense:
+            # What the dense ladder holds is the order's slot
+            levels.remove(price, held)
+        else:
+            level = levels[price]
+            level.remove(order)
+            if len(level) == 0:
+                _ = levels.pop(price)
+        if self.tape is not None:
+            self.tape.record(CANCEL, (self.day, self.second), order.agentid,
+                             order_id, price, order.size,
+                             BUY if side == 'B' else SELL)
+        return order
+
+    def resting(self, order_id):
+        """ The resting limit order with id order_id
+
+        Returns
+        -------
+
+        order : Order
+            The order, or None if it has been filled or cancelled.  On the
+            dense ladder it is a copy, built from the ladder's arrays.
+            """
+        entry = self._orders.get(order_id)
+        if entry is None:
+            return None
+        side, price, order = entry
+        if self._dense:
+            # The dense ladder keeps the order's slot rather than an Order
+            levels = self.bids if side == 'B' else self.asks
+            slot = order
+            order = Order(price, float(levels.sizes[slot]),
+                          (int(levels.tdays[slot]), int(levels.seconds[slot])),
+                          levels.agentids[slot], order_id)
+        return order
+
+    def _limit_order(self, agent_id, order_price, order_side,
+                     order_size, time):
+        """
+        Adds an order to the existing order book.  Meant to be called
+        by OrderBook.order.
+
+        Parameters
+        ----------
+
+        agentid : str
+            Unique agent id
+
+        order_price : int
+            The order price in ticks
+
+        order_side : str
+            "B" or "S"
+
+        order_size : int
+            Number of shares
+
+        time : tuple
+            (day, second)
+
+        Returns
+        -------
+
+        order_id : int
+            The id of the new order
+        """
+        if self.l2 is not None:
+            self.l2.observe(self)
+        order_id = self._last_id + 1
+        levels = self.asks if order_side == 'S' else self.bids
+        if self._dense:
+            order = levels.add(order_price, order_size, time, agent_id,
+                               order_id)
+        else:
+            order = Order(order_price, order_size, time, agent_id, order_id)
+            level = levels.get(order_price)
+            if level is None:
+                level = levels[order_price] = OrderQueue()
+            level.append(order)
+        self._last_id = order_id
+        self._orders[order_id] = (order_side, order_price, order)
+        if self.tape is not None:
+            self.tape.record(PLACE, time, agent_id, order_id,
+                             order_price, order_size,
+                             BUY if order_side == 'B' else SELL)
+        return order_id
+
+    def _market_order(self, order_side, order_size, time, fills=None):
+        """ Executes a market order.  Should be called by OrderBook.order
+
+        order_side : str
+            "B" or "S"
+
+        order_size : int
+            Number of shares
+
+        time : tuple
+            (day, second)
+
+        fills : list
+            If given, (order_id, price, size) is appended for every resting
+            order hit, with the price in ticks"""
+        if self.l2 is not None:
+            self.l2.observe(self)
+        if order_size <= 0:
+            return
+        # Fail before trading if the other side cannot fill the order
+        levels = self.bids if order_side == 'S' else self.asks
+        if not levels.covers(order_size):
+            raise ValueError('No orders on the {0} side'.format(levels.side))
+        if self._dense:
+            return self._market_order_dense(order_side, order_size, time,
+                                            fills)
+
+        if order_side == 'S':
+            # If a sell
+            while order_size > 0:
+                # While there are shares to be traded
+                entry = self.bids.best()
+                # What is the price
+                level = self.bids[entry]
+                highest_bid = level.head
+                # The order to be traded with??
+                size = min(highest_bid.size, order_size)
+                # Size is either order size or lowest ask?
+                self.transactions.append(time[0], highest_bid.agentid,
+                                         highest_bid.price, size,
+                                         highest_bid.time, BUY)
+                # Record the transaction
+                highest_bid.size = highest_bid.size - size
+                level.size -= size
+                # Trade the shares
+                self.last = entry
+                # Set price of last trade
+                if self.tape is not None:
+                    self.tape.record(TRADE, time, highest_bid.agentid,
+                                     highest_bid.order_id, entry, size, BUY)
+                if fills is not None:
+                    fills.append((highest_bid.order_id, entry, size))
+                if highest_bid.size == 0:
+                    # If highest bid is exhausted
+                    agent = self.Agents.get(highest_bid.agentid)
+                    if agent is not None:
+                        #If it wasn't part of the initial configuration
+                        agent.position = ('out', 'NA')
+                        # Change the agents status
+                    _ = level.popleft()
+                    del self._orders[highest_bid.order_id]
+                    # Remove a bid with 0 size
+                if len(level) == 0:
+                    # If no more bids at that price
+                    _ = self.bids.pop(entry)
+                    # Remove price from the dict
+                order_size = order_size - size
+        else:
+            # Buy orders are parallel to sell orders
+            while order_size > 0:
+                entry = self.asks.best()
+                level = self.asks[entry]
+                lowest_ask = level.head
+                size = min(lowest_ask.size,  order_size)
+                self.transactions.append(time[0], lowest_ask.agentid,
+                                         lowest_ask.price, size,
+                                         lowest_ask.time, SELL)
+                lowest_ask.size = lowest_ask.size - size
+                level.size -= size
+                self.last = entry
+                if self.tape is not None:
+                    self.tape.record(TRADE, time, lowest_ask.agentid,
+                                     lowest_ask.order_id, entry, size, SELL)
+                if fills is not None:
+                    fills.append((lowest_ask.order_id, entry, size))
+                if lowest_ask.size == 0:
+                    agent = self.Agents.get(lowest_ask.agentid)
+                    if agent is not None:
+                        agent.position = ('out', 'NA')
+                    _ = level.popleft()
+                    del self._orders[lowest_ask.order_id]
+                if len(level) == 0:
+                    _ = self.asks.pop(entry)
+                order_size = order_size - size
+
+    def _market_order_dense(self, order_side, order_size, time,
+                            fills=None):
+        """ Executes a market order on the dense ladder.  Called by
+        _market_order once the order is known to fill, with the same
+        arguments, and leaves the book in the same state as the heap
+        ladder would.
+
+        kernel.match walks the levels and fills the orders in the ladder's
+        arrays in one call, and the fills are then logged in bulk."""
+        if order_side == 'S':
+            levels, side = self.bids, BUY
+        else:
+            levels, side = self.asks, SELL
+        slots, prices, sizes = levels.match(order_size,
+                                            _matcher(self._kernel))
+        agentids = [levels.agentids[slot] for slot in slots]
+        if len(slots) == 1:
+            slot = slots[0]
+            self.transactions.append(time[0], agentids[0], prices[0],
+                                     sizes[0], (levels.tdays[slot],
+                                                levels.seconds[slot]), side)
+        else:
+            self.transactions.extend(time[0], agentids, prices, sizes,
+                                     levels.tdays[slots],
+                                     levels.seconds[slots], side)
+        self.last = prices[-1]
+        order_ids = levels.order_ids[slots].tolist()
+        if self.tape is not None:
+            for agentid, order_id, price, size in zip(agentids, order_ids,
+                                                      prices, sizes):
+                self.tape.record(TRADE, time, agentid, order_id, price, size,
+                                 side)
+        if fills is not None:
+            fills.extend(zip(order_ids, prices, sizes))
+        # Only the last order hit can be left partly filled
+        if levels.sizes[slots[-1]] > 0:
+            slots, agentids, order_ids = slots[:-1], agentids[:-1], \
+                order_ids[:-1]
+        agents = self.Agents
+        orders = self._orders
+        for slot, agentid, order_id in zip(slots, agentids, order_ids):
+            agent = agents.get(agentid)
+            if agent is not None:
+                agent.position = ('out', 'NA')
+            del orders[order_id]
+            levels.release(slot)
@@ -0,0 +1,24 @@
+from .trader import Trader
+
+
+class Chartist(Trader):
+    """
+    An exponential smoothing trader
+
+    Parameters
+    ----------
+
+    bets : float
+        Belief stickiness to past price
+    """
+
+    def __init__(self, Book, phi, rho, mu, psi, Sigma, agentid, delta, beta,
+                 initval=100):
+        super(Chartist, self).__init__(Book, phi, rho, mu, psi, Sigma,
+                                       agentid, delta, initval)
+        self.beta = beta
+
+    def valuation(self, truep, vt_1):
+        self.val =   self.beta * self.Book.price + \
+          (1 - self.beta) * vt_1 + self.Book.rng.normal(0, self.delta)
+        return self.val
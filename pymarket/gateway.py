@@ -0,0 +1,561 @@
+"""
+An asyncio gateway that lets strategies outside the simulation trade in an
+order book.
+
+Clients send batches of messages, each batch a list of dicts:
+
+    {'type': 'order', 'price': 10050, 'side': 'B', 'size': 100}
+    {'type': 'order', 'price': 'Market', 'side': 'S', 'size': 100}
+    {'type': 'cancel', 'order_id': 12}
+
+The batches of every client go through one bounded queue and are applied
+to the book in the order they arrive, at the book's current time.  The
+sender gets an ack with a result for each message: the order id of a
+limit order, None for a market order, True or False for a cancel, or
+{'error': reason} if the message was rejected.  Every client gets the
+trades and, whenever it changes, the top of the book:
+
+    {'type': 'ack', 'batch': 0, 'results': [...]}
+    {'type': 'trade', 'day': 0, 'second': 0, 'price': 10040, 'size': 100,
+     'side': 'S', 'order_id': 7}
+    {'type': 'top', 'day': 0, 'second': 0, 'bid': 10040, 'bid_size': 900,
+     'ask': 10060, 'ask_size': 500}
+
+Prices are in ticks.  The side of a trade is that of the market order and
+order_id that of the resting order it hit.  An empty side of the book has
+bid or ask None.
+
+Each client's queue of outgoing messages is bounded too.  When a client
+stops reading, the gateway waits for it before applying more batches, so
+the inbound queue fills and senders wait in turn.
+
+Clients connect in memory with Gateway.connect, which returns a
+LoopbackClient, or over a local socket with Gateway.serve and
+SocketClient.open, which exchange the same messages as JSON lines.  The
+module runs a gateway to a filled book:
+
+    python -m pymarket.gateway [--port PORT] [--seed SEED]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+from .book import OrderBook
+
+# Longest JSON line, one batch, a socket connection reads
+LINE_LIMIT = 2 ** 24
+
+
+class LoopbackClient(object):
+    """
+    A client of a Gateway in the same process.  Made by Gateway.connect.
+
+    Parameters
+    ----------
+
+    gateway : Gateway
+        The gateway
+
+    agentid : str
+        The agent id the client's orders are placed under
+
+    maxsize : int
+        Number of messages to the client that can wait to be received
+
+    Attributes
+    ----------
+
+    outbound : asyncio.Queue
+        The messages to the client
+    """
+    def __init__(self, gateway, agentid, maxsize):
+        self.gateway = gateway
+        self.agentid = agentid
+        self.outbound = asyncio.Queue(maxsize)
+        self.closed = False
+        self._batches = 0
+
+    async def send(self, messages):
+        """ Sends a batch of messages.  Waits while the gateway's inbound
+        queue is full."""
+        if self.closed:
+            raise RuntimeError('The client is closed')
+        await self.gateway._inbound.put((self, list(messages)))
+
+    async def receive(self):
+        """ The next message to the client, or None once it is closed"""
+        if self.closed:
+            return None
+        message = await self.outbound.get()
+        return None if self.closed else message
+
+    def close(self):
+        """ Disconnects from the gateway.  Messages not yet received are
+        dropped."""
+        if self.closed:
+            return
+        self.closed = True
+        self.gateway._clients.pop(self.agentid, None)
+        # Make room for a put the gateway may be waiting on.  Only an empty
+        # queue can have a receive waiting on it, which None wakes.
+        waiting = self.outbound.empty()
+        while not self.outbound.empty():
+            self.outbound.get_nowait()
+        if waiting:
+            self.outbound.put_nowait(None)
+
+
+class SocketClient(object):
+    """
+    A client of a Gateway over a socket, made by SocketClient.open.  Sends
+    and receives the same messages as a LoopbackClient.
+    """
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open(cls, host='127.0.0.1', port=8765):
+        """ Connects to a gateway serving at host and port"""
+        reader, writer = await asyncio.open_connection(host, port,
+                                                       limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def send(self, messages):
+        """ Sends a batch of messages.  Waits while the socket's buffer is
+        full."""
+        self._writer.write(_line(list(messages)))
+        await self._writer.drain()
+
+    async def receive(self):
+        """ The next message to the client, or None once the connection
+        is closed"""
+        line = await self._reader.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    async def close(self):
+        """ Closes the connection"""
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+class Gateway(object):
+    """
+    Applies the order and cancel messages of its clients to an order book
+    and publishes the trades and top of book back to them.
+
+    Use it as an async context manager, or call start and stop.
+
+    Parameters
+    ----------
+
+    book : OrderBook
+        The book.  Nothing else should trade in it while the gateway runs.
+
+    maxsize : int
+        Number of batches that can wait to be applied, and of messages that
+        can wait to be received by each client
+    """
+    def __init__(self, book, maxsize=1024):
+        self.book = book
+        self.maxsize = maxsize
+        self._inbound = asyncio.Queue(maxsize)
+        self._clients = {}
+        self._connected = 0
+        self._top = None
+        self._task = None
+        self._server = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def start(self):
+        """ Starts applying batches.  Must be called from a running event
+        loop."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+            self._task.add_done_callback(self._stopped)
+
+    async def stop(self):
+        """ Stops serving and applying batches, and closes every client.
+        Batches not yet applied are dropped.  If applying batches failed,
+        the error is raised here."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        task, self._task = self._task, None
+        try:
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            for client in list(self._clients.values()):
+                client.close()
+
+    def _stopped(self, task):
+        """ Closes every client if applying batches failed, so none of them
+        waits for an ack that will not come"""
+        if not task.cancelled() and task.exception() is not None:
+            for client in list(self._clients.values()):
+                client.close()
+
+    def connect(self, agentid=None):
+        """ A new LoopbackClient
+
+        Parameters
+        ----------
+
+        agentid : str
+            The agent id of the client's orders.  'gw0', 'gw1', ... by
+            default.
+        """
+        if agentid is None:
+            agentid = 'gw{0}'.format(self._connected)
+        if agentid in self._clients:
+            raise ValueError('Agent {0!r} is already connected'.format(
+                agentid))
+        self._connected += 1
+        client = LoopbackClient(self, agentid, self.maxsize)
+        self._clients[agentid] = client
+        return client
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """ Accepts socket connections at host and port, 0 for any free
+        port, and returns the port"""
+        self._server = await asyncio.start_server(self._connection, host,
+                                                  port, limit=LINE_LIMIT)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _connection(self, reader, writer):
+        client = self.connect()
+        forward = asyncio.ensure_future(self._forward(client, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    batch = [None]
+                if not isinstance(batch, list):
+                    batch = [batch]
+                await client.send(batch)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            client.close()
+            await forward
+            writer.close()
+
+    async def _forward(self, client, writer):
+        try:
+            while True:
+                message = await client.receive()
+                if message is None:
+                    break
+                writer.write(_line(message))
+                await writer.drain()
+        except ConnectionError:
+            client.close()
+
+    async def _run(self):
+        inbound = self._inbound
+        while True:
+            client, batch = await inbound.get()
+            await self._apply(client, batch)
+
+    async def _apply(self, client, batch):
+        """ Applies a batch and publishes the results"""
+        book = self.book
+        day, second = book.day, book.second
+        results = []
+        trades = []
+        for message in batch:
+            try:
+                results.append(self._message(client, message, (day, second),
+                                             trades))
+            except ValueError as error:
+                results.append({'error': str(error)})
+            except Exception as error:
+                # Whatever a message does wrong is its own result, it must
+                # not stop the batches after it
+                results.append({'error': '{0}: {1}'.format(
+                    type(error).__name__, error)})
+        ack = {'type': 'ack', 'batch': client._batches, 'results': results}
+        client._batches += 1
+        if not client.closed:
+            await client.outbound.put(ack)
+        for side, order_id, price, size in trades:
+            await self._publish({'type': 'trade', 'day': day,
+                                 'second': second, 'price': int(price),
+                                 'size': float(size), 'side': side,
+                                 'order_id': int(order_id)})
+        top = self._top_of_book()
+        if top != self._top:
+            self._top = top
+            bid, bid_size, ask, ask_size = top
+            await self._publish({'type': 'top', 'day': day, 'second': second,
+                                 'bid': bid, 'bid_size': bid_size,
+                                 'ask': ask, 'ask_size': ask_size})
+
+    def _message(self, client, message, time, trades):
+        """ Applies one message and returns its result"""
+        if not isinstance(message, dict):
+            raise ValueError('A message must be an object')
+        kind = message.get('type')
+        if kind == 'order':
+            return self._order(client, message, time, trades)
+        if kind == 'cancel':
+            return self._cancel(client, message)
+        raise ValueError('Unknown message type {0!r}'.format(kind))
+
+    def _order(self, client, message, time, trades):
+        book = self.book
+        price = message.get('price')
+        side = message.get('side')
+        size = message.get('size')
+        if side not in ('B', 'S'):
+            raise ValueError('side must be B or S')
+        if (isinstance(size, bool) or not isinstance(size, (int, float)) or
+                not size > 0):
+            raise ValueError('size must be a positive number')
+        opposite = book.asks if side == 'B' else book.bids
+        if price == 'Market':
+            # The book rejects a market order larger than the other side
+            # before it trades
+            fills = []
+            book.order(client.agentid, 'Market', side, size, time, fills)
+            trades.extend((side,) + fill for fill in fills)
+            return None
+        if isinstance(price, bool) or not isinstance(price, int) or price <= 0:
+            raise ValueError("price must be a positive number of ticks or "
+                             "'Market'")
+        # The book does not match limit orders, so they must not cross
+        if len(opposite) and (price >= opposite.best() if side == 'B' else
+                              price <= opposite.best()):
+            raise ValueError('Limit order would cross the book')
+        return book.order(client.agentid, price, side, size, time)
+
+    def _cancel(self, client, message):
+        book = self.book
+        order_id = message.get('order_id')
+        if isinstance(order_id, bool) or not isinstance(order_id, int):
+            raise ValueError('order_id must be an integer')
+        resting = book.resting(order_id)
+        if resting is None:
+            return False
+        if resting.agentid != client.agentid:
+            raise ValueError('Order {0} is not the client\'s'.format(
+                order_id))
+        return book.cancel(order_id) is not None
+
+    def _top_of_book(self):
+        top = []
+        for side in self.book.depth(1):
+            if len(side):
+                top.extend([int(side['price'][0]), float(side['size'][0])])
+            else:
+                top.extend([None, 0.])
+        return tuple(top)
+
+    async def _publish(self, message):
+        """ Puts a message to every client, waiting for those with full
+        queues"""
+        for client in list(self._clients.values()):
+            if not client.closed:
+                await client.outbound.put(message)
+
+
+def _line(message):
+    return (json.dumps(message) + '\n').encode()
+
+
+async def replay(client, batches, rate=None):
+    """ Sends batches to a gateway at a steady rate
+
+    Parameters
+    ----------
+
+    client : LoopbackClient or SocketClient
+        The client to send them with
+
+    batches : iterable
+        Batches of messages
+
+    rate : float or None
+        Batches per second, or None to send each as soon as the gateway
+        takes it
+
+    Returns
+    -------
+
+    sent : int
+        Number of batches sent
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    sent = 0
+    for batch in batches:
+        if rate is not None:
+            delay = start + sent / float(rate) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await client.send(batch)
+        sent += 1
+    return sent
+
+
+async def loopback(book, batches=1000, size=10, rate=None, seed=0,
+                   maxsize=64):
+    """ Trades random messages in book through a LoopbackClient while a
+    second client only listens
+
+    Limit orders are placed 20 to 70 ticks from the last price, market
+    orders are for 100 to 900 shares and cancels pick one of the trader's
+    orders known from earlier acks.
+
+    Parameters
+    ----------
+
+    book : OrderBook
+        The book, deep enough for the market orders, see
+        behavioral_book.initbook
+
+    batches : int
+        Number of batches
+
+    size : int
+        Messages per batch
+
+    rate : float or None
+        Batches per second, see replay
+
+    seed : int
+        Seed for the messages
+
+    maxsize : int
+        See Gateway
+
+    Returns
+    -------
+
+    sent : int
+        Number of messages sent
+
+    received : int
+        Number of messages received by both clients
+
+    seconds : float
+        Wall time until the last ack
+    """
+    rng = np.random.default_rng(seed)
+    ids = []
+    counts = {'acks': 0, 'received': 0}
+    done = asyncio.Event()
+
+    def generate():
+        for _ in range(batches):
+            batch = []
+            for kind, side, away, shares in zip(
+                    rng.choice(['limit', 'market', 'cancel'], size,
+                               p=[.6, .2, .2]).tolist(),
+                    rng.choice(['B', 'S'], size).tolist(),
+                    rng.integers(20, 70, size).tolist(),
+                    rng.integers(1, 10, size).tolist()):
+                if kind == 'cancel' and ids:
+                    batch.append({'type': 'cancel', 'order_id': ids.pop(
+                        int(rng.integers(len(ids))))})
+                elif kind == 'market':
+                    batch.append({'type': 'order', 'price': 'Market',
+                                  'side': side, 'size': 100 * shares})
+                else:
+                    price = book.last - away if side == 'B' else \
+                        book.last + away
+                    batch.append({'type': 'order', 'price': price,
+                                  'side': side, 'size': 100 * shares})
+            yield batch
+
+    async def read(client, trader):
+        while True:
+            message = await client.receive()
+            if message is None:
+                return
+            counts['received'] += 1
+            if trader and message['type'] == 'ack':
+                ids.extend(result for result in message['results']
+                           if type(result) is int)
+                counts['acks'] += 1
+                if counts['acks'] == batches:
+                    done.set()
+
+    async with Gateway(book, maxsize) as gateway:
+        trader = gateway.connect()
+        listener = gateway.connect()
+        readers = [asyncio.ensure_future(read(trader, True)),
+                   asyncio.ensure_future(read(listener, False))]
+        start = time.perf_counter()
+        await replay(trader, generate(), rate)
+        await done.wait()
+        seconds = time.perf_counter() - start
+    await asyncio.gather(*readers)
+    return batches * size, counts['received'], seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Runs a gateway to an order book filled by initbook')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ladder', default='heap', help='heap or dense')
+    parser.add_argument('--maxsize', type=int, default=1024,
+                        help='length of the bounded queues')
+    parser.add_argument('--loopback', type=int, metavar='BATCHES',
+                        help='instead of serving, trade this many random '
+                        'batches of 10 messages through a loopback client '
+                        'and report the message rate')
+    args = parser.parse_args(argv)
+
+    from .behavioral_book import initbook
+    book = OrderBook({}, {}, seed=args.seed, ladder=args.ladder)
+    initbook(book)
+
+    if args.loopback is not None:
+        sent, received, seconds = asyncio.run(loopback(
+            book, args.loopback, seed=args.seed, maxsize=args.maxsize))
+        print('{0} messages sent, {1} received in {2:.3f} s, {3:.0f} '
+              'messages/s in'.format(sent, received, seconds,
+                                     sent / seconds))
+        return 0
+
+    async def serve():
+        async with Gateway(book, args.maxsize) as gateway:
+            port = await gateway.serve(args.host, args.port)
+            print('gateway on {0}:{1}'.format(args.host, port))
+            sys.stdout.flush()
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
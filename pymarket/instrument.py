@@ -0,0 +1,188 @@
+"""
+Instrumentation of the hot paths of the book and the agents.
+
+A Profiler counts the calls to the matching engine, cancellations, price
+sampling, queries and valuations by agent class, and accumulates their
+wall time.  On every market order it also samples the depth of the book
+and the number of price levels the order swept.
+
+Nothing is instrumented while no Profiler is enabled.  Enabling one
+replaces the hot path methods on their classes with timed wrappers and
+disabling it puts the originals back, so the simulation runs the
+unmodified code whenever profiling is off.
+
+    with Profiler() as profiler:
+        go(0, seed=1)
+    print(profiler.report())
+"""
+import json
+import time
+from collections import defaultdict
+from functools import wraps
+
+from .book import OrderBook
+from .chartist import Chartist
+from .population import Population
+from .smrt_money import Institution
+from .trader import Trader
+from .trender import Trender
+
+# The timed methods: (name in the report, class, method).  Times are
+# inclusive, so a query includes the valuation, price sampling and
+# matching it leads to.
+HOT_PATHS = [
+    ('match.limit', OrderBook, '_limit_order'),
+    ('match.market', OrderBook, '_market_order'),
+    ('cancel', OrderBook, 'cancel'),
+    ('price_sampling', Trader, 'order_price'),
+    ('query.Trader', Trader, 'query_agent'),
+    ('query.Population', Population, 'query'),
+    ('valuation.Chartist', Chartist, 'valuation'),
+    ('valuation.Institution', Institution, 'valuation'),
+    ('valuation.Trender', Trender, 'valuation'),
+    ('valuation.Population', Population, 'valuation'),
+]
+
+
+class Profiler(object):
+    """
+    Counts and times calls to the HOT_PATHS while enabled.  Only one
+    Profiler can be enabled at a time.
+
+    Attributes
+    ----------
+
+    calls : dict
+        Keys are hot path names, values the number of calls
+
+    seconds : dict
+        Keys are hot path names, values the wall time spent in them
+
+    samples : dict
+        Keys are sample names, values [count, total, maximum].  Sampled on
+        every market order: 'depth.bid_levels' and 'depth.ask_levels', the
+        number of populated price levels, 'depth.orders', the number of
+        resting orders, and 'swept_levels', the number of price levels the
+        order traded at.
+    """
+    _enabled = None
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.samples = {}
+        self._originals = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def enable(self):
+        """ Installs the timed wrappers"""
+        if Profiler._enabled is not None:
+            raise RuntimeError('Another Profiler is already enabled')
+        Profiler._enabled = self
+        for name, cls, attr in HOT_PATHS:
+            original = cls.__dict__[attr]
+            self._originals.append((cls, attr, original))
+            if attr == '_market_order':
+                wrapper = self._market_order(name, original)
+            else:
+                wrapper = self._timed(name, original)
+            setattr(cls, attr, wrapper)
+
+    def disable(self):
+        """ Puts the original methods back"""
+        for cls, attr, original in reversed(self._originals):
+            setattr(cls, attr, original)
+        self._originals = []
+        if Profiler._enabled is self:
+            Profiler._enabled = None
+
+    def sample(self, name, value):
+        """ Adds a value to a sample"""
+        sample = self.samples.get(name)
+        if sample is None:
+            self.samples[name] = [1, value, value]
+        else:
+            sample[0] += 1
+            sample[1] += value
+            if value > sample[2]:
+                sample[2] = value
+
+    def _timed(self, name, method):
+        calls = self.calls
+        seconds = self.seconds
+        clock = time.perf_counter
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds[name] += clock() - start
+                calls[name] += 1
+        return timed
+
+    def _market_order(self, name, method):
+        calls = self.calls
+        seconds = self.seconds
+        sample = self.sample
+        clock = time.perf_counter
+
+        @wraps(method)
+        def market_order(book, order_side, order_size, time, fills=None):
+            if fills is None:
+                fills = []
+            first = len(fills)
+            sample('depth.bid_levels', len(book.bids))
+            sample('depth.ask_levels', len(book.asks))
+            sample('depth.orders', len(book._orders))
+            start = clock()
+            try:
+                return method(book, order_side, order_size, time, fills)
+            finally:
+                seconds[name] += clock() - start
+                calls[name] += 1
+                sample('swept_levels',
+                       len(set(fill[1] for fill in fills[first:])))
+        return market_order
+
+    def metrics(self):
+        """ The counters as a JSON-able dict"""
+        return {
+            'calls': dict(self.calls),
+            'seconds': dict(self.seconds),
+            'samples': dict((name, {'count': count, 'mean': total / count,
+                                    'max': maximum})
+                            for name, (count, total, maximum)
+                            in self.samples.items())}
+
+    def report(self):
+        """ A table of the counters"""
+        lines = ['{0:<24} {1:>10} {2:>10} {3:>10}'.format(
+            'hot path', 'calls', 'seconds', 'us/call')]
+        for name in sorted(self.calls, key=self.seconds.get, reverse=True):
+            calls = self.calls[name]
+            lines.append('{0:<24} {1:>10} {2:>10.3f} {3:>10.2f}'.format(
+                name, calls, self.seconds[name],
+                self.seconds[name] / calls * 1e6))
+        if self.samples:
+            lines.append('')
+            lines.append('{0:<24} {1:>10} {2:>10} {3:>10}'.format(
+                'per market order', 'count', 'mean', 'max'))
+            for name, (count, total, maximum) in sorted(self.samples.items()):
+                lines.append('{0:<24} {1:>10} {2:>10.2f} {3:>10}'.format(
+                    name, count, total / float(count), maximum))
+        return '\n'.join(lines)
+
+    def dump(self, path, **labels):
+        """ Appends the metrics, with labels such as a run id, as one JSON
+        line to the file at path"""
+        record = dict(labels, time=time.time(), **self.metrics())
+        with open(path, 'a') as metrics:
+            metrics.write(json.dumps(record, sort_keys=True) + '\n')
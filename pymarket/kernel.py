@@ -0,0 +1,166 @@
+"""
+The matching kernel of the dense ladder.
+
+match fills a market order against one side of a DenseLevels in a single
+call over its arrays.  It walks the levels from the best price, fills
+their orders oldest first, unlinks the orders it exhausts and finds the
+new best level, and returns the fills as arrays.  The fill sizes are
+computed with the same sequence of operations as the heap ladder's
+OrderBook._market_order, so all of them give identical fills.
+
+match is compiled with Numba if it is installed, and is match_python,
+plain Python, otherwise.  OrderBook(ladder='dense', matching='python')
+always uses match_python.  check_parity runs seeded simulations with
+every kind of matching and compares every transaction:
+
+    python -m pymarket.kernel [seed ...]
+"""
+import sys
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAVE_NUMBA = numba is not None
+
+
+def match_python(size, best, step, count, head, tail, depth, sizes, next,
+                 prev):
+    """ Fills a market order of size against a side of a DenseLevels
+
+    Parameters
+    ----------
+
+    size : float
+        Number of shares.  The side must hold at least as many.
+
+    best : int
+        The index of the best level
+
+    step : int
+        -1 for the bid side, 1 for the ask side
+
+    count, head, tail, depth : array
+        The level arrays of the side, updated in place
+
+    sizes, next, prev : array
+        The order arrays of the side, updated in place
+
+    Returns
+    -------
+
+    n : int
+        Number of fills
+
+    slots, levels, fills : array
+        The slot of the order, the index of the level and the size of
+        every fill, in their first n elements
+
+    emptied : int
+        Number of levels emptied
+
+    best : int
+        The index of the new best level, -1 if the side is empty
+    """
+    width = count.shape[0]
+    slots = np.empty(sizes.shape[0], dtype=np.int64)
+    levels = np.empty(sizes.shape[0], dtype=np.int64)
+    fills = np.empty(sizes.shape[0])
+    n = 0
+    emptied = 0
+    i = best
+    while size > 0 and 0 <= i < width:
+        if count[i] == 0:
+            i += step
+            continue
+        slot = head[i]
+        fill = min(sizes[slot], size)
+        sizes[slot] = sizes[slot] - fill
+        depth[i] -= fill
+        size = size - fill
+        slots[n] = slot
+        levels[n] = i
+        fills[n] = fill
+        n += 1
+        if sizes[slot] == 0:
+            following = next[slot]
+            head[i] = following
+            if following < 0:
+                tail[i] = -1
+            else:
+                prev[following] = -1
+            count[i] -= 1
+            if count[i] == 0:
+                depth[i] = 0
+                emptied += 1
+    while 0 <= i < width and count[i] == 0:
+        i += step
+    if not 0 <= i < width:
+        i = -1
+    return n, slots, levels, fills, emptied, i
+
+
+if HAVE_NUMBA:
+    match = numba.njit(cache=True)(match_python)
+else:
+    match = match_python
+
+
+def check_parity(seeds=(0, 1, 2), engines=('objects', 'arrays'), days=600):
+    """ Runs seeded simulations on the heap ladder and on the dense ladder
+    with both kinds of matching, and compares their transactions
+
+    Parameters
+    ----------
+
+    seeds : sequence
+        The seeds to run
+
+    engines : sequence
+        'objects' and/or 'arrays', see behavioral_book.go
+
+    days : int
+        Number of days each simulation runs
+
+    Returns
+    -------
+
+    mismatches : list
+        (seed, engine, matching) of every dense simulation whose
+        transactions differ from the heap ladder's
+    """
+    from .behavioral_book import setup, run_days
+    mismatches = []
+    for seed in seeds:
+        for engine in engines:
+            state = setup(seed, engine)
+            run_days(state, days, verbose=False)
+            heap = state['book'].transactions
+            for matching in ('python', 'kernel'):
+                state = setup(seed, engine, ladder='dense', matching=matching)
+                run_days(state, days, verbose=False)
+                dense = state['book'].transactions
+                if not (heap.agentids == dense.agentids and
+                        np.array_equal(heap.records, dense.records) and
+                        np.array_equal(heap.offsets, dense.offsets)):
+                    mismatches.append((seed, engine, matching))
+    return mismatches
+
+
+def main(argv=None):
+    seeds = [int(arg) for arg in (sys.argv[1:] if argv is None else argv)]
+    mismatches = check_parity(seeds or (0, 1, 2))
+    print('kernel: {0}'.format('numba' if HAVE_NUMBA else 'python'))
+    for seed, engine, matching in mismatches:
+        print('fills differ for seed {0}, engine {1}, matching {2}'.format(
+            seed, engine, matching))
+    if not mismatches:
+        print('identical fills')
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
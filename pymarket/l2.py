@@ -0,0 +1,121 @@
+"""
+A stream of L2 snapshots, the aggregate size at the top price levels of an
+order book, sampled as the book's clock moves and stored in one
+structured array.
+"""
+import numpy as np
+
+
+def snapshot_dtype(n):
+    """ The dtype of a snapshot of n levels per side: the time it was taken
+    (day, second) and the price in ticks and aggregate size of each level,
+    best first.  Missing levels have price 0 and size 0."""
+    return np.dtype([('day', np.int32), ('second', np.int32),
+                     ('bid_price', np.int64, (n,)),
+                     ('bid_size', np.float64, (n,)),
+                     ('ask_price', np.int64, (n,)),
+                     ('ask_size', np.float64, (n,))])
+
+
+class L2Stream(object):
+    """
+    Snapshots of the top n levels of an order book, see OrderBook.depth.
+
+    Pass the stream to an OrderBook as l2.  Every day gets a snapshot at
+    its close.  With an interval, the book is also sampled during the
+    day: before the first order or cancellation at or after each multiple
+    of interval seconds, so the snapshot shows the book as of that second.
+    Snapshots are indexed by day like the TransactionLog.
+
+    Parameters
+    ----------
+
+    n : int
+        Number of levels per side
+
+    interval : int or None
+        Seconds between snapshots during the day.  None for one snapshot a
+        day, at the close.
+
+    capacity : int
+        Number of snapshots to allocate room for at first.  The array
+        doubles when it is full.
+    """
+    def __init__(self, n, interval=None, capacity=1024):
+        self.n = n
+        self.interval = interval
+        self._records = np.zeros(capacity, dtype=snapshot_dtype(n))
+        self._n = 0
+        self._days = []
+        self._offsets = []
+        self._day_index = {}
+        self._next = None
+
+    def __len__(self):
+        """ Number of snapshots"""
+        return self._n
+
+    def observe(self, book):
+        """ Called by the book before every order and cancellation.  Takes
+        a snapshot if a sample time has been reached."""
+        if self.interval is None:
+            return
+        if not self._days or self._days[-1] != book.day:
+            self._next = 0
+        if book.second >= self._next:
+            self._record(book)
+            self._next = (book.second // self.interval + 1) * self.interval
+
+    def close_day(self, book):
+        """ Called by the book at the close of a day.  Takes the day's
+        closing snapshot."""
+        self._record(book)
+        self._next = None
+
+    def _record(self, book):
+        day = book.day
+        if not self._days or self._days[-1] != day:
+            self._day_index[day] = len(self._days)
+            self._days.append(day)
+            self._offsets.append(self._n)
+        n = self._n
+        if n == len(self._records):
+            records = np.zeros(max(2 * n, 1024), dtype=self._records.dtype)
+            records[:n] = self._records
+            self._records = records
+        bids, asks = book.depth(self.n)
+        record = self._records[n]
+        record['day'] = day
+        record['second'] = book.second
+        record['bid_price'][:len(bids)] = bids['price']
+        record['bid_size'][:len(bids)] = bids['size']
+        record['ask_price'][:len(asks)] = asks['price']
+        record['ask_size'][:len(asks)] = asks['size']
+        self._n = n + 1
+
+    @property
+    def records(self):
+        """ Every snapshot, as a view of the structured array"""
+        return self._records[:self._n]
+
+    @property
+    def days(self):
+        """ The days with snapshots, in order"""
+        return np.array(self._days, dtype=np.int64)
+
+    def day_slice(self, day):
+        """ The slice of records taken on day"""
+        i = self._day_index.get(day)
+        if i is None:
+            return slice(0, 0)
+        if i + 1 < len(self._offsets):
+            return slice(self._offsets[i], self._offsets[i + 1])
+        return slice(self._offsets[i], self._n)
+
+    def discard(self):
+        """ Drops every snapshot taken so far"""
+        self._records[:self._n] = 0
+        self._n = 0
+        self._days = []
+        self._offsets = []
+        self._day_index = {}
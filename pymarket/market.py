@@ -0,0 +1,344 @@
+"""
+Many order books, one per symbol, with correlated fundamental values.
+"""
+import multiprocessing
+import traceback
+
+import numpy as np
+
+from .book import OrderBook
+
+
+def run_book_day(book, shock, batch):
+    """ Runs one day of a book: starts the day, moves the fundamental value
+    by shock, applies the batch in order and closes the day.
+
+    Parameters
+    ----------
+
+    book : OrderBook instance
+
+    shock : float
+        The change in the fundamental value
+
+    batch : list
+        The day's messages in the order they arrive.  Either
+        ('order', agentid, price, side, size, second) or
+        ('cancel', order_id).
+
+    Returns
+    -------
+
+    summary : dict
+        'close' the day's close, 'truep' the fundamental value, 'volume'
+        the shares traded, 'order_ids' the result of each order message
+        (the id of a limit order, None for a market order)
+    """
+    book.day += 1
+    book.second = 0
+    book.transactions.start_day(book.day)
+    book.truep += shock
+    order_ids = []
+    for message in batch:
+        if message[0] == 'order':
+            _, agentid, price, side, size, second = message
+            book.second = second
+            order_ids.append(book.order(agentid, price, side, size,
+                                        (book.day, second)))
+        else:
+            book.cancel(message[1])
+    book.close_day()
+    log = book.transactions
+    volume = float(log.records['size'][log.day_slice(book.day)].sum())
+    return {'close': book.price, 'truep': book.truep, 'volume': volume,
+            'order_ids': order_ids}
+
+
+class Market(object):
+    """
+    A universe of symbols, each traded in its own OrderBook.
+
+    The fundamental values of the books move together: every day one
+    vector of correlated normal shocks is drawn for all of them.
+
+    Parameters
+    ----------
+
+    symbols : list
+        The symbols
+
+    corr : array
+        Correlation matrix of the fundamental shocks.  Defaults to
+        independent shocks.
+
+    vol : float or array
+        Standard deviation of the daily fundamental shock of each symbol
+
+    seed : int or None
+        Seeds the shocks and every book's random pool
+
+    init : callable
+        Called with each new book, for example behavioral_book.initbook.
+        For ParallelMarket it must be picklable.
+
+    Attributes
+    ----------
+
+    books : dict
+        Keys are symbols, values are their OrderBook
+    """
+    def __init__(self, symbols, corr=None, vol=0., seed=None, init=None):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        if corr is None:
+            corr = np.eye(n)
+        self._chol = np.linalg.cholesky(np.asarray(corr, dtype=float))
+        self.vol = np.broadcast_to(np.asarray(vol, dtype=float), (n,))
+        seeds = np.random.SeedSequence(seed).spawn(n + 1)
+        self._rng = np.random.default_rng(seeds[0])
+        self._seeds = dict(zip(self.symbols, seeds[1:]))
+        self.init = init
+        self.books = self._make_books(self.symbols)
+
+    def _make_books(self, symbols):
+        books = {}
+        for symbol in symbols:
+            book = OrderBook({}, {}, seed=self._seeds[symbol])
+            if self.init is not None:
+                self.init(book)
+            books[symbol] = book
+        return books
+
+    def shocks(self):
+        """ Draws one day of correlated fundamental shocks
+
+        Returns
+        -------
+
+        shocks : dict
+            Keys are symbols, values are the shock to their fundamental value
+        """
+        z = self._rng.standard_normal(len(self.symbols))
+        return dict(zip(self.symbols,
+                        (self.vol * self._chol.dot(z)).tolist()))
+
+    def move(self):
+        """ Moves every fundamental value by one day of shocks"""
+        for symbol, shock in self.shocks().items():
+            self.books[symbol].truep += shock
+
+    def order(self, symbol, agentid, price, side, size, time):
+        """ Routes an order to the book of symbol, see OrderBook.order"""
+        return self.books[symbol].order(agentid, price, side, size, time)
+
+    def cancel(self, symbol, order_id):
+        """ Cancels an order in the book of symbol, see OrderBook.cancel"""
+        return self.books[symbol].cancel(order_id)
+
+    def run_day(self, batches):
+        """ Runs one day of every book
+
+        Parameters
+        ----------
+
+        batches : dict
+            Keys are symbols, values are the day's messages for their book,
+            see run_book_day.  Symbols without messages still run the day.
+
+        Returns
+        -------
+
+        summaries : dict
+            Keys are symbols, values are the summaries of run_book_day
+        """
+        shocks = self.shocks()
+        return dict((symbol, run_book_day(self.books[symbol], shocks[symbol],
+                                          batches.get(symbol, ())))
+                    for symbol in self.symbols)
+
+
+def _shard(conn, books):
+    """ Runs the books of one worker until it receives None
+
+    Every command gets one reply, ('ok', result), or ('error', symbol,
+    error, traceback) if it raised in the book of symbol.  A day stops at
+    the book that raised, like in Market.run_day, and the worker goes on
+    with the next command.
+    """
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        command, payload = message
+        symbol = None
+        try:
+            if command == 'day':
+                summaries = {}
+                for symbol, (moved, shock, batch) in payload.items():
+                    books[symbol].truep += moved
+                    summaries[symbol] = run_book_day(books[symbol], shock,
+                                                     batch)
+                conn.send(('ok', summaries))
+            elif command == 'books':
+                conn.send(('ok', books))
+        except Exception as error:
+            text = traceback.format_exc()
+            try:
+                conn.send(('error', symbol, error, text))
+            except Exception:
+                # The error itself does not pickle, its traceback does
+                conn.send(('error', symbol, None, text))
+    conn.close()
+
+
+class ParallelMarket(Market):
+    """
+    A Market whose books are matched in worker processes.
+
+    The symbols are split between the workers.  run_day sends each worker
+    the shocks and batches of its books and waits for every worker to
+    finish the day, so all books cross day boundaries together.  Orders
+    and cancels routed with order and cancel, and the shocks of move, are
+    held until the next run_day and go to the workers with its batches.
+    An error raised in a worker is raised again by run_day or collect.
+    Use it as a context manager, or call close, to stop the workers.
+
+    Parameters
+    ----------
+
+    symbols, corr, vol, seed, init :
+        See Market
+
+    workers : int
+        Number of worker processes.  Defaults to the number of CPUs.
+    """
+    def __init__(self, symbols, corr=None, vol=0., seed=None, init=None,
+                 workers=None):
+        super(ParallelMarket, self).__init__(symbols, corr, vol, seed, init)
+        workers = min(workers or multiprocessing.cpu_count(),
+                      len(self.symbols))
+        shards = [self.symbols[k::workers] for k in range(workers)]
+        self._owner = {}
+        self._workers = []
+        for shard in shards:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard,
+                args=(child, dict((symbol, self.books[symbol])
+                                  for symbol in shard)))
+            process.daemon = True
+            process.start()
+            child.close()
+            self._workers.append((parent, process))
+            for symbol in shard:
+                self._owner[symbol] = len(self._workers) - 1
+        # The workers own the books from here on
+        self.books = None
+        self._routed = dict((symbol, []) for symbol in self.symbols)
+        self._moved = dict((symbol, 0.) for symbol in self.symbols)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def order(self, symbol, agentid, price, side, size, time):
+        """ Routes an order to the book of symbol.  It is placed at the
+        start of the next run_day, at second time[1], and its order id is
+        in the 'order_ids' of that day's summary.
+
+        Returns
+        -------
+
+        order_id : None
+            The id is not known until the day has run
+        """
+        self._routed[symbol].append(('order', agentid, price, side, size,
+                                     time[1]))
+
+    def cancel(self, symbol, order_id):
+        """ Routes a cancel to the book of symbol.  It is applied at the
+        start of the next run_day, after the orders routed before it."""
+        self._routed[symbol].append(('cancel', order_id))
+
+    def move(self):
+        """ Draws one day of shocks.  They are added to the fundamental
+        values at the start of the next run_day, with its own shocks."""
+        for symbol, shock in self.shocks().items():
+            self._moved[symbol] += shock
+
+    def run_day(self, batches):
+        """ Runs one day of every book, see Market.run_day.  The messages
+        routed since the last day go before each book's batch."""
+        shocks = self.shocks()
+        payloads = [dict() for _ in self._workers]
+        for symbol in self.symbols:
+            batch = self._routed[symbol] + list(batches.get(symbol, ()))
+            payloads[self._owner[symbol]][symbol] = \
+                (self._moved[symbol], shocks[symbol], batch)
+            self._routed[symbol] = []
+            self._moved[symbol] = 0.
+        for (conn, _), payload in zip(self._workers, payloads):
+            conn.send(('day', payload))
+        summaries = {}
+        for result in self._receive():
+            summaries.update(result)
+        return summaries
+
+    def collect(self):
+        """ Copies of every book, fetched from the workers
+
+        Returns
+        -------
+
+        books : dict
+            Keys are symbols, values are their OrderBook
+        """
+        books = {}
+        for conn, _ in self._workers:
+            conn.send(('books', None))
+        for result in self._receive():
+            books.update(result)
+        return books
+
+    def _receive(self):
+        """ The replies of every worker to the command just sent
+
+        All of them are read before an error is raised, so the next
+        command gets its own replies.  The first error raised in a worker
+        is raised again here, its traceback in the worker chained to it.
+        """
+        results = []
+        failure = None
+        for conn, _ in self._workers:
+            reply = conn.recv()
+            if reply[0] == 'ok':
+                results.append(reply[1])
+            elif failure is None:
+                failure = reply[1:]
+        if failure is not None:
+            symbol, error, text = failure
+            label = ('a worker' if symbol is None else
+                     'the worker of {0}'.format(symbol))
+            where = RuntimeError('Raised in {0}:\n{1}'.format(label, text))
+            if error is None:
+                raise where
+            raise error from where
+        return results
+
+    def close(self):
+        """ Stops the workers, also those that have died"""
+        try:
+            for conn, process in self._workers:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, EOFError, OSError):
+                    pass
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+                conn.close()
+        finally:
+            self._workers = []
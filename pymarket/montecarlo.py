@@ -0,0 +1,245 @@
+"""
+Monte Carlo replications of behavioral_book.go over a process pool.
+"""
+import os
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# The series returned by behavioral_book.go, in order
+SERIES = ('daily_prices', 'chart_vol_directed', 'inst_vol_directed',
+          'chart2_vol_directed', 'chart_vol_und', 'inst_vol_und',
+          'chart2_vol_und', 'trueps')
+
+
+class P2Quantile(object):
+    """
+    Streaming estimate of a quantile with the P-square algorithm of Jain
+    and Chlamtac (1985).  Only five markers are kept per element, whatever
+    the number of observations.  Observations are arrays and every element
+    is estimated independently.
+
+    Parameters
+    ----------
+
+    p : float
+        The quantile, between 0 and 1
+    """
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self._first = []
+        self._dn = np.array([0., p / 2, p, (1 + p) / 2, 1.])
+
+    def update(self, x):
+        """ Adds an observation"""
+        x = np.asarray(x, dtype=float)
+        self.count += 1
+        if self.count <= 5:
+            self._first.append(x)
+            if self.count == 5:
+                self._q = np.sort(np.array(self._first), axis=0)
+                self._n = np.tile(np.arange(5.)[:, None], (1, x.size))
+                self._q = self._q.reshape(5, -1)
+                self._want = 4 * self._dn
+                self._first = []
+            return
+        x = x.reshape(-1)
+        q = self._q
+        n = self._n
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        # Markers above the observation move up one position
+        n[1:] += x[None, :] < q[1:]
+        n[4] = self.count - 1
+        self._want += self._dn
+        for i in (1, 2, 3):
+            d = self._want[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | \
+                ((d <= -1) & (n[i - 1] - n[i] < -1))
+            if not move.any():
+                continue
+            d = np.sign(d)
+            parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+            up = d > 0
+            neighbour_q = np.where(up, q[i + 1], q[i - 1])
+            neighbour_n = np.where(up, n[i + 1], n[i - 1])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                linear = q[i] + d * (neighbour_q - q[i]) / (neighbour_n - n[i])
+            inside = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            q[i] = np.where(move, np.where(inside, parabolic, linear), q[i])
+            n[i] = np.where(move, n[i] + d, n[i])
+
+    @property
+    def value(self):
+        """ The current estimate"""
+        if self.count < 5:
+            return np.percentile(np.array(self._first), 100 * self.p, axis=0)
+        return self._q[2].copy()
+
+
+class ReplicationSummary(object):
+    """
+    Mean, variance and quantiles of every series of go(), updated one
+    replication at a time.  The raw results are not kept.
+
+    Parameters
+    ----------
+
+    quantiles : tuple
+        The quantiles to estimate
+
+    Attributes
+    ----------
+
+    n : int
+        Number of replications seen
+
+    mean : list
+        The mean of each series
+
+    quantiles : dict
+        Keys are the quantiles, values the estimate of each series
+    """
+    def __init__(self, quantiles=(.05, .5, .95)):
+        self.n = 0
+        self._quantiles = tuple(quantiles)
+        self._mean = None
+        self._m2 = None
+        self._p2 = None
+
+    def update(self, result):
+        """ Adds the result of one replication"""
+        result = [np.asarray(series, dtype=float) for series in result]
+        self.n += 1
+        if self._mean is None:
+            self._mean = [np.zeros_like(series) for series in result]
+            self._m2 = [np.zeros_like(series) for series in result]
+            self._p2 = [dict((p, P2Quantile(p)) for p in self._quantiles)
+                        for _ in result]
+        for k, series in enumerate(result):
+            # Welford's update
+            delta = series - self._mean[k]
+            self._mean[k] += delta / self.n
+            self._m2[k] += delta * (series - self._mean[k])
+            for estimator in self._p2[k].values():
+                estimator.update(series)
+
+    @property
+    def mean(self):
+        return [mean.copy() for mean in self._mean]
+
+    @property
+    def var(self):
+        """ The sample variance of each series"""
+        return [m2 / max(self.n - 1, 1) for m2 in self._m2]
+
+    @property
+    def quantiles(self):
+        return dict((p, [p2[p].value for p2 in self._p2])
+                    for p in self._quantiles)
+
+
+def _replicate(i, seed, params, engine):
+    from .behavioral_book import go
+    return i, go(i, seed=seed, engine=engine, params=params, verbose=False)
+
+
+def iter_replications(n, params, workers=None, seed=None, engine='objects',
+                      window=None):
+    """ Runs n replications of go() over a process pool, and yields
+    (i, result) for each one as it finishes.
+
+    Replication i is seeded with the i-th child of SeedSequence(seed), so
+    its result does not depend on the number of workers or on the order
+    the replications finish in.
+
+    Replications are submitted in order, and only while they are fewer
+    than window past the oldest one not yet finished.  So at most window
+    results are held at a time, here or by run_replications, and a
+    finished result is dropped as soon as it is yielded.
+
+    Parameters
+    ----------
+
+    n : int
+        Number of replications
+
+    params : dict
+        The simulation parameters, see params.py
+
+    workers : int
+        Number of worker processes.  Defaults to the number of CPUs.
+
+    seed : int or None
+        The root seed
+
+    engine : str
+        'objects' or 'arrays', see go()
+
+    window : int
+        Number of replications that can be submitted past the oldest one
+        not yet finished.  Defaults to twice the number of workers.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if window is None:
+        window = 2 * workers
+    seeds = np.random.SeedSequence(seed).spawn(n)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        submitted = 0
+        while submitted < n or running:
+            oldest = min(running.values()) if running else submitted
+            while submitted < n and submitted < oldest + window:
+                future = pool.submit(_replicate, submitted, seeds[submitted],
+                                     params, engine)
+                running[future] = submitted
+                submitted += 1
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            while done:
+                future = done.pop()
+                del running[future]
+                result = future.result()
+                del future
+                yield result
+
+
+def run_replications(n, params, workers=None, seed=None, engine='objects',
+                     quantiles=(.05, .5, .95), callback=None, window=None):
+    """ Runs n replications of go() over a process pool and summarizes them
+
+    Results are folded into the summary in replication order, holding
+    back only the ones that finish early, so the summary is the same for
+    any number of workers.  Fewer than window results are ever held back.
+
+    Parameters
+    ----------
+
+    n, params, workers, seed, engine, window :
+        See iter_replications
+
+    quantiles : tuple
+        The quantiles to estimate
+
+    callback : callable
+        Called with (i, result) as each replication finishes
+
+    Returns
+    -------
+
+    summary : ReplicationSummary
+    """
+    summary = ReplicationSummary(quantiles)
+    pending = {}
+    for i, result in iter_replications(n, params, workers, seed, engine,
+                                       window):
+        if callback is not None:
+            callback(i, result)
+        pending[i] = result
+        while summary.n in pending:
+            summary.update(pending.pop(summary.n))
+        del result
+    return summary
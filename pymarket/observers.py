@@ -0,0 +1,171 @@
+"""
+Per-day observers of a running simulation.
+
+Instead of summarizing the transaction log once a run is over, a Pipeline
+hands every day's trades to a list of observers as soon as the day
+closes.  The observers keep only what they summarize, so with discard the
+pipeline can drop the raw trades after each day and the log stays the
+size of one day however long the run.
+"""
+from collections import deque
+
+import numpy as np
+
+from .ticks import to_price
+
+
+class Observer(object):
+    """
+    Receives the trades of every day.  Subclasses override observe.
+    """
+    def observe(self, day, trades, book):
+        """ Called once a day has closed
+
+        Parameters
+        ----------
+
+        day : int
+            The day
+
+        trades : dict
+            The day's transactions as columns, one element per
+            transaction: 'agent' (class code), 'price' (in dollars),
+            'size', 'tday' and 'second' (the time of the order) and 'side'
+            (1 for 'B', -1 for 'S')
+
+        book : OrderBook instance
+            The book, after the day has closed
+        """
+        raise NotImplementedError
+
+
+class Closes(Observer):
+    """
+    The price at the close of every day.  Days without trades close at the
+    last price traded before them.
+
+    Attributes
+    ----------
+
+    closes : list
+        One close per day observed
+    """
+    def __init__(self):
+        self.closes = []
+
+    def observe(self, day, trades, book):
+        self.closes.append(book.price)
+
+
+class ClassVolume(Observer):
+    """
+    Shares traded every day by each agent class, undirected and signed by
+    the side of the agent.
+
+    Parameters
+    ----------
+
+    nclasses : int
+        Number of agent classes
+
+    Attributes
+    ----------
+
+    directed : list
+        For each class, the bought minus sold shares of every day
+
+    undirected : list
+        For each class, the shares traded every day
+    """
+    def __init__(self, nclasses=3):
+        self.nclasses = nclasses
+        self.directed = [[] for _ in range(nclasses)]
+        self.undirected = [[] for _ in range(nclasses)]
+
+    def observe(self, day, trades, book):
+        agent = trades['agent']
+        size = trades['size']
+        directed = np.bincount(agent, weights=size * trades['side'],
+                               minlength=self.nclasses)
+        undirected = np.bincount(agent, weights=size,
+                                 minlength=self.nclasses)
+        for k in range(self.nclasses):
+            self.directed[k].append(float(directed[k]))
+            self.undirected[k].append(float(undirected[k]))
+
+
+class Returns(Observer):
+    """
+    The n day return at every close, from the last n + 1 closes.
+
+    Parameters
+    ----------
+
+    n : int
+        Number of days the returns are over
+
+    Attributes
+    ----------
+
+    returns : list
+        One return per day observed, from the n-th day on
+    """
+    def __init__(self, n):
+        self.n = n
+        self.returns = []
+        self._closes = deque(maxlen=n + 1)
+
+    def observe(self, day, trades, book):
+        self._closes.append(book.price)
+        if len(self._closes) > self.n:
+            first = self._closes[0]
+            self.returns.append((self._closes[-1] - first) / first)
+
+
+class Pipeline(object):
+    """
+    Hands each day's trades from a book's transaction log to observers.
+
+    Parameters
+    ----------
+
+    observers : list
+        Observer instances, called in order
+
+    classes : callable
+        Maps an agent id to a small non-negative int, its class.  Defaults
+        to 0 for every agent.
+
+    discard : bool
+        If true, the transaction log is cleared once the observers have
+        seen a day, so it never holds more than one day of trades
+    """
+    def __init__(self, observers, classes=None, discard=False):
+        self.observers = list(observers)
+        self.classes = classes
+        self.discard = discard
+        self._codes = np.zeros(0, dtype=np.int64)
+
+    def _agent_classes(self, agentids):
+        """ The class of every agent code, for the agent ids seen so far"""
+        new = agentids[len(self._codes):]
+        if new:
+            self._codes = np.append(self._codes, [
+                self.classes(agentid) if self.classes is not None else 0
+                for agentid in new]).astype(np.int64)
+        return self._codes
+
+    def observe(self, book):
+        """ Passes the day the book just closed to every observer"""
+        log = book.transactions
+        records = log.records[log.day_slice(book.day)]
+        trades = {'agent': self._agent_classes(log.agentids)[records['agent']],
+                  'price': to_price(records['price']),
+                  'size': records['size'],
+                  'tday': records['tday'],
+                  'second': records['second'],
+                  'side': records['side']}
+        for observer in self.observers:
+            observer.observe(book.day, trades, book)
+        if self.discard:
+            log.discard()
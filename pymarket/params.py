@@ -0,0 +1,41 @@
+from functools import partial
+
+# The sampling functions take the np.random.Generator of the run first, so
+# a seeded run draws the same agents.  They are module level functions
+# rather than lambdas so params can be pickled and sent to worker processes.
+
+
+def uniform(rng, lims):
+    """ Draws uniformly between lims"""
+    return rng.uniform(lims[0], lims[1])
+
+
+def _uniform(low, high, rng):
+    return rng.uniform(low, high)
+
+
+def _normal(loc, scale, rng):
+    return rng.normal(loc, scale)
+
+
+params = {
+'num_inst': 20, # Number of institutional traders
+'num_chart': 250, # number of chartists
+'num_chart2': 100,
+'fund_vol': 0, # Volatility of fundamental value
+'delta' : uniform, #draw delta
+'deltalimsc': (0, 1), # Limits for perception error
+'deltalimsi': (0, .0001),
+'beta' : uniform,
+'betalims' : (.2,.8),
+'phi' : uniform, # Agression
+'philims' : (20,50),
+'rholims' : (.2, .5),
+'rho' : uniform,
+'muchart' : partial(_normal, 20000, 4000),
+'muinst' : partial(_normal, 100000, 10000),
+'Sigmachart' : partial(_uniform, 100, 500),
+'Sigmainst' : partial(_uniform, 10000, 15000),
+'psi' : partial(_uniform, 10, 50),
+'horizon': partial(_uniform, 10, 30)
+}
@@ -0,0 +1,220 @@
+import numpy as np
+from functools import partial
+
+from .trader import SPOTS, SPOT
+
+# Agent classes, and the prefix of their agent ids
+CHARTIST = 0
+INSTITUTION = 1
+TRENDER = 2
+PREFIXES = {CHARTIST: 'C', INSTITUTION: 'I', TRENDER: 'C2-'}
+
+
+class _SizedGenerator(object):
+    """ Passes size=n to every draw of a np.random.Generator, so the
+    sampling functions in params return arrays of n draws"""
+    def __init__(self, generator, n):
+        self._generator = generator
+        self._n = n
+
+    def __getattr__(self, name):
+        return partial(getattr(self._generator, name), size=self._n)
+
+
+class Population(object):
+    """
+    A population of agents stored as arrays, one entry per agent.
+
+    The agents follow the same rules as Chartist, Institution and Trender,
+    but a day's valuations, participation, sides, quantities and limit
+    prices are computed for the whole population in vectorized passes.
+    Only the resulting orders go through OrderBook.order, one agent at a
+    time in a random sequence.
+
+    Unlike the Trader objects, all agents decide from the state of the
+    book at the start of the day.  Limit prices are still set off the best
+    bid or ask at the time the order reaches the book.
+
+    Parameters
+    ----------
+
+    Book : OrderBook instance
+        The order book the agents trade in
+
+    kind : array
+        CHARTIST, INSTITUTION or TRENDER for each agent
+
+    phi, rho, mu, psi, Sigma, delta : array
+        The Trader parameters of each agent
+
+    beta : array
+        Belief stickiness to past price.  Only used by chartists.
+
+    val : array
+        The initial valuations
+
+    horizon : array
+        Number of closes the trend is fit on.  Only used by trenders.
+
+    agentids : list
+        The agent ids.  By default the class prefix followed by the
+        agent's number within its class.
+
+    Attributes
+    ----------
+
+    diff : array
+        The difference between each agent's belief and the observed price,
+        as a fraction of the price
+
+    order_id : array
+        The book's id for each agent's resting limit order, 0 if none
+    """
+    def __init__(self, Book, kind, phi, rho, mu, psi, Sigma, delta, beta,
+                 val, horizon=None, agentids=None):
+        self.Book = Book
+        self.kind = np.asarray(kind)
+        n = len(self.kind)
+        self.phi = np.asarray(phi, dtype=float)
+        self.rho = np.asarray(rho, dtype=float)
+        self.mu = np.asarray(mu, dtype=float)
+        self.psi = np.asarray(psi, dtype=float)
+        self.Sigma = np.asarray(Sigma, dtype=float)
+        self.delta = np.asarray(delta, dtype=float)
+        self.beta = np.asarray(beta, dtype=float)
+        self.val = np.array(val, dtype=float)
+        if horizon is None:
+            horizon = np.zeros(n, dtype=int)
+        self.horizon = np.asarray(horizon, dtype=int)
+        if agentids is None:
+            agentids = [None] * n
+            for k, prefix in PREFIXES.items():
+                for j, i in enumerate(np.flatnonzero(self.kind == k)):
+                    agentids[i] = prefix + str(j)
+        self.agentids = list(agentids)
+        self.diff = np.full(n, 10**-10)
+        self.order_id = np.zeros(n, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.kind)
+
+    @classmethod
+    def from_params(cls, Book, params):
+        """ Draws a population the way behavioral_book.go draws its agents
+
+        Parameters
+        ----------
+
+        Book : OrderBook instance
+            The order book the agents trade in.  Draws come from its
+            random pool.
+
+        params : dict
+            The simulation parameters, see params.py
+        """
+        generator = Book.rng.generator
+        counts = [(CHARTIST, params['num_chart']),
+                  (INSTITUTION, params['num_inst']),
+                  (TRENDER, params['num_chart2'])]
+        columns = dict((name, []) for name in
+                       ['kind', 'phi', 'rho', 'mu', 'psi', 'Sigma', 'delta',
+                        'beta', 'val', 'horizon'])
+        for kind, n in counts:
+            rng = _SizedGenerator(generator, n)
+            columns['kind'].append(np.full(n, kind))
+            columns['phi'].append(params['phi'](rng, params['philims']))
+            columns['rho'].append(params['rho'](rng, params['rholims']))
+            columns['psi'].append(params['psi'](rng))
+            if kind == INSTITUTION:
+                columns['mu'].append(params['muinst'](rng))
+                columns['Sigma'].append(params['Sigmainst'](rng))
+                columns['delta'].append(
+                    params['delta'](rng, params['deltalimsi']))
+                columns['beta'].append(np.zeros(n))
+                columns['val'].append(np.full(n, 100.))
+                columns['horizon'].append(np.zeros(n, dtype=int))
+            else:
+                columns['mu'].append(params['muchart'](rng))
+                columns['Sigma'].append(params['Sigmachart'](rng))
+                if kind == CHARTIST:
+                    columns['delta'].append(
+                        params['delta'](rng, params['deltalimsc']))
+                else:
+                    columns['delta'].append(params['delta'](rng, (1, 2)))
+                columns['beta'].append(params['beta'](rng, params['betalims']))
+                columns['val'].append(rng.uniform(99, 101))
+                if kind == TRENDER:
+                    columns['horizon'].append(
+                        params['horizon'](rng).astype(int))
+                else:
+                    columns['horizon'].append(np.zeros(n, dtype=int))
+        return cls(Book, **dict((name, np.concatenate(arrays))
+                                for name, arrays in columns.items()))
+
+    def valuation(self):
+        """ Updates every agent's valuation of the asset"""
+        book = self.Book
+        kind = self.kind
+        noise = book.rng.generator.normal(0, self.delta)
+        chart = kind == CHARTIST
+        self.val[chart] = self.beta[chart] * book.price + \
+            (1 - self.beta[chart]) * self.val[chart] + noise[chart]
+        inst = kind == INSTITUTION
+        self.val[inst] = book.truep + noise[inst]
+        trend = np.flatnonzero(kind == TRENDER)
+        for horizon in np.unique(self.horizon[trend]).tolist():
+            # The least squares line through the last horizon closes,
+            # extrapolated horizon closes ahead
+            intercept, slope = book.trend(horizon)
+            self.val[trend[self.horizon[trend] == horizon]] = \
+                intercept + slope * horizon * 2
+        return self.val
+
+    def query(self):
+        """ Queries every agent once.  The agents whose valuation flipped
+        sides cancel their resting orders, and the agents that participate
+        replace their resting orders with new ones."""
+        book = self.Book
+        generator = book.rng.generator
+        n = len(self)
+        current_price = book.price
+        val = self.valuation()
+        diff = (current_price - val) / float(current_price)
+        flipped = np.signbit(diff) != np.signbit(self.diff)
+        p_partic = 1 - np.exp(-np.abs(diff) * self.phi)
+        partic = generator.random(n) < p_partic
+        self.diff = diff
+        qty = generator.normal(self.mu, self.Sigma) + \
+            self.psi * self.Sigma * np.abs(diff)
+        # Inverse CDF of trader.price_cdf
+        rate = np.abs(diff / self.rho)
+        total = -np.expm1(-SPOTS * rate)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spots = np.ceil(-np.log1p(-generator.random(n) * total) / rate)
+        spots = np.clip(np.nan_to_num(spots), 1, SPOTS) - 1
+        cancel = (self.order_id != 0) & (flipped | partic)
+        active = np.flatnonzero(cancel | partic)
+        active = generator.permutation(active)
+        agentids = self.agentids
+        order_id = self.order_id
+        time = (book.day, book.second)
+        for i, c, p, s, sell, q in zip(
+                active.tolist(), cancel[active].tolist(),
+                partic[active].tolist(), spots[active].tolist(),
+                (diff[active] > 0).tolist(), qty[active].tolist()):
+            if c:
+                book.cancel(order_id[i])
+                order_id[i] = 0
+            if not p:
+                continue
+            if s == 0:
+                book.order(agentids[i], 'Market', 'S' if sell else 'B', q,
+                           time)
+            elif sell:
+                order_id[i] = book.order(agentids[i],
+                                         book.best_bid() + int(s) * SPOT, 'S',
+                                         q, time)
+            else:
+                order_id[i] = book.order(agentids[i],
+                                         book.best_ask() - int(s) * SPOT, 'B',
+                                         q, time)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class RandomPool(object):
+    """
+    Random numbers for the agents' decisions, drawn in blocks.
+
+    Drawing one number at a time from NumPy has a large fixed cost per
+    call.  The pool draws blocks of uniforms and standard normals from a
+    np.random.Generator and hands them out one at a time as Python floats.
+
+    Parameters
+    ----------
+
+    seed : int, SeedSequence or None
+        Seed for the generator.  The same seed gives the same sequence of
+        draws.
+
+    size : int
+        Number of draws in each block
+
+    Attributes
+    ----------
+
+    generator : np.random.Generator
+        The underlying generator, for draws that are not on the hot path
+    """
+    def __init__(self, seed=None, size=4096):
+        self.generator = np.random.default_rng(seed)
+        self.size = size
+        self._uniforms = iter(())
+        self._normals = iter(())
+
+    def uniform(self, low=0., high=1.):
+        """ Draws from the uniform distribution on [low, high)"""
+        try:
+            u = next(self._uniforms)
+        except StopIteration:
+            self._uniforms = iter(self.generator.random(self.size).tolist())
+            u = next(self._uniforms)
+        return low + (high - low) * u
+
+    def normal(self, loc=0., scale=1.):
+        """ Draws from the normal distribution with mean loc and standard
+        deviation scale"""
+        try:
+            z = next(self._normals)
+        except StopIteration:
+            self._normals = iter(
+                self.generator.standard_normal(self.size).tolist())
+            z = next(self._normals)
+        return loc + scale * z
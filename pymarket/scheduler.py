@@ -0,0 +1,88 @@
+from heapq import heappush, heappop
+from math import log1p
+
+import numpy as np
+
+
+class EventScheduler(object):
+    """
+    Queries agents at Poisson arrival times instead of once a day each.
+
+    Every agent wakes up after an exponential waiting time.  The pending
+    wake ups are kept in a priority queue, and run_day pops them in time
+    order, moves the book's clock to each one and queries the agent.  The
+    cost of a day is the number of arrivals in it, so with rates below one
+    it no longer grows with the whole population.
+
+    Parameters
+    ----------
+
+    Book : OrderBook instance
+        The order book the agents trade in.  Waiting times are drawn from
+        its random pool.
+
+    agents : list
+        Trader instances
+
+    rate : float or array
+        Expected number of times each agent is queried per day.  A rate of
+        1 queries agents as often as the daily shuffle does, and agents with
+        a rate of 0 are never queried.
+
+    seconds : int
+        Number of seconds in a day, the resolution of the book's clock
+
+    Attributes
+    ----------
+
+    now : float
+        The scheduler's time, in days since it started
+    """
+    def __init__(self, Book, agents, rate=1., seconds=23400):
+        self.Book = Book
+        self.agents = list(agents)
+        self.rate = np.broadcast_to(np.asarray(rate, dtype=float),
+                                    (len(self.agents),)).tolist()
+        self.seconds = seconds
+        self.now = 0.
+        self._seq = 0
+        self._events = []
+        for i in range(len(self.agents)):
+            self._schedule(i, self.now)
+
+    def __len__(self):
+        """ Number of pending events"""
+        return len(self._events)
+
+    def _schedule(self, i, after):
+        """ Adds agent i's next arrival after time after"""
+        if self.rate[i] <= 0:
+            return
+        wait = -log1p(-self.Book.rng.uniform()) / self.rate[i]
+        self._seq += 1
+        heappush(self._events, (after + wait, self._seq, i))
+
+    def run_day(self):
+        """ Queries the agents that arrive before the end of the day, and
+        moves the scheduler to the start of the next day
+
+        Returns
+        -------
+
+        arrivals : int
+            Number of agents queried
+        """
+        events = self._events
+        agents = self.agents
+        book = self.Book
+        start = self.now
+        end = start + 1.
+        arrivals = 0
+        while events and events[0][0] < end:
+            time, _, i = heappop(events)
+            book.second = int((time - start) * self.seconds)
+            agents[i].query_agent()
+            self._schedule(i, time)
+            arrivals += 1
+        self.now = end
+        return arrivals
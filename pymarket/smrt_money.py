@@ -0,0 +1,7 @@
+from .trader import Trader
+
+class Institution(Trader):
+
+    def valuation(self, truep, vt_1=None):
+        self.val =  truep + self.Book.rng.normal(0, self.delta)
+        return self.val
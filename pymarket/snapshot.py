@@ -0,0 +1,54 @@
+"""
+Snapshots of a running simulation, so runs can fork from a saved state.
+
+A snapshot is the pickled state of a replication: the order book with its
+price levels, resting orders, clock, closes, trends, transactions and
+random pool, and every agent, as Trader objects in the book's Agents or
+as a Population.  Loading a snapshot gives an independent copy, so any
+number of runs can branch from one warm start.  The book's tape is not
+part of a snapshot.
+"""
+import pickle
+
+# Changed whenever the state that is pickled changes shape
+VERSION = 4
+
+
+def dumps(state):
+    """ The snapshot of a state, as bytes
+
+    Parameters
+    ----------
+
+    state : dict
+        The state of a replication, see behavioral_book.setup
+    """
+    return pickle.dumps((VERSION, state), pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data):
+    """ A new copy of the state saved in a snapshot
+
+    Parameters
+    ----------
+
+    data : bytes
+        A snapshot from dumps
+    """
+    version, state = pickle.loads(data)
+    if version != VERSION:
+        raise ValueError('Snapshot version {0}, expected {1}'.format(
+            version, VERSION))
+    return state
+
+
+def save(path, state):
+    """ Writes the snapshot of a state to a file"""
+    with open(path, 'wb') as snap:
+        snap.write(dumps(state))
+
+
+def load(path):
+    """ Reads a state back from a file written by save"""
+    with open(path, 'rb') as snap:
+        return loads(snap.read())
@@ -0,0 +1,248 @@
+"""
+Parameter sweeps over the params dict.
+
+A design is a list of cells, each a dict of the params keys it overrides.
+Sweep runs every cell for every seed over a process pool and checkpoints
+each finished run to its own file, named by a hash of the full params and
+the seed.  Running the same sweep again skips the runs that are already on
+disk, so an interrupted sweep picks up where it stopped.
+"""
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import numpy as np
+
+from .montecarlo import SERIES
+from .params import params as base_params
+
+
+def grid(space):
+    """ The full factorial design over space
+
+    Parameters
+    ----------
+
+    space : dict
+        Keys are params keys, values the list of values to try
+
+    Returns
+    -------
+
+    cells : list
+        One dict of overrides per combination
+    """
+    keys = sorted(space)
+    return [dict(zip(keys, values))
+            for values in itertools.product(*[space[key] for key in keys])]
+
+
+def latin_hypercube(space, n, seed=None):
+    """ A Latin hypercube design of n cells over space
+
+    Parameters
+    ----------
+
+    space : dict
+        Keys are params keys.  For a scalar key the value is its (low, high)
+        range.  For a key holding limits, such as 'philims', the value is a
+        list with one (low, high) range per limit.  Ranges whose bounds are
+        both ints draw ints.
+
+    n : int
+        Number of cells
+
+    seed : int or None
+        Seed of the design
+
+    Returns
+    -------
+
+    cells : list
+        n dicts of overrides
+    """
+    rng = np.random.default_rng(seed)
+    keys = sorted(space)
+    ranges = []
+    for key in keys:
+        if np.ndim(space[key]) == 2:
+            ranges.extend((key, j, low, high)
+                          for j, (low, high) in enumerate(space[key]))
+        else:
+            ranges.append((key, None) + tuple(space[key]))
+    # One stratum per cell in every dimension, strata shuffled independently
+    strata = np.argsort(rng.random((len(ranges), n)), axis=1)
+    points = (strata + rng.random((len(ranges), n))) / n
+    cells = [dict() for _ in range(n)]
+    for (key, j, low, high), column in zip(ranges, points):
+        values = low + (high - low) * column
+        if isinstance(low, int) and isinstance(high, int):
+            values = np.round(values).astype(int)
+        for cell, value in zip(cells, values.tolist()):
+            if j is None:
+                cell[key] = value
+            else:
+                cell.setdefault(key, [None] * len(space[key]))[j] = value
+    for cell in cells:
+        for key in cell:
+            if isinstance(cell[key], list):
+                cell[key] = tuple(cell[key])
+    return cells
+
+
+def _describe(value):
+    """ A JSON-able description of a params value"""
+    if isinstance(value, dict):
+        return dict((key, _describe(v)) for key, v in value.items())
+    if isinstance(value, partial):
+        return [_describe(value.func)] + [_describe(arg)
+                                          for arg in value.args]
+    if callable(value):
+        return '{0}.{1}'.format(value.__module__, value.__qualname__)
+    if isinstance(value, (tuple, list)):
+        return [_describe(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def cell_key(params, seed, engine='objects'):
+    """ The hash a run is checkpointed under
+
+    Parameters
+    ----------
+
+    params : dict
+        The full params of the run
+
+    seed : int
+        The seed of the run
+
+    engine : str
+        'objects' or 'arrays', see behavioral_book.go
+    """
+    description = json.dumps({'params': _describe(params), 'seed': seed,
+                              'engine': engine}, sort_keys=True)
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+def _run_cell(path, params, seed, engine, meta):
+    from .behavioral_book import go
+    result = go(0, seed=seed, engine=engine, params=params, verbose=False)
+    arrays = dict((name, np.asarray(series, dtype=float))
+                  for name, series in zip(SERIES, result))
+    tmp = path[:-len('.npz')] + '.tmp.npz'
+    np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+class Sweep(object):
+    """
+    Runs a design of cells, for every seed, and checkpoints the results
+
+    Parameters
+    ----------
+
+    design : list
+        Dicts of params overrides, see grid and latin_hypercube
+
+    outdir : str
+        Directory the runs are checkpointed in, one .npz file per run
+
+    seeds : sequence
+        The seeds each cell is run with
+
+    params : dict
+        The params the cells override
+
+    engine : str
+        'objects' or 'arrays', see behavioral_book.go
+
+    workers : int
+        Number of worker processes.  Defaults to the number of CPUs.
+
+    Attributes
+    ----------
+
+    failed : list
+        (overrides, seed, exception) for every run of the last call to
+        run that raised.  Failed runs are not checkpointed.
+    """
+    def __init__(self, design, outdir, seeds=(0,), params=base_params,
+                 engine='objects', workers=None):
+        self.design = list(design)
+        self.outdir = outdir
+        self.seeds = list(seeds)
+        self.params = params
+        self.engine = engine
+        self.workers = workers
+        self.failed = []
+
+    def runs(self):
+        """ Yields (path, params, seed, overrides) for every run"""
+        for overrides in self.design:
+            cell_params = dict(self.params)
+            cell_params.update(overrides)
+            for seed in self.seeds:
+                key = cell_key(cell_params, seed, self.engine)
+                path = os.path.join(self.outdir, key + '.npz')
+                yield path, cell_params, seed, overrides
+
+    def pending(self):
+        """ The runs that are not on disk yet"""
+        return [run for run in self.runs() if not os.path.exists(run[0])]
+
+    def run(self, callback=None):
+        """ Runs every pending run
+
+        Parameters
+        ----------
+
+        callback : callable
+            Called with the path of each run as it is checkpointed
+
+        Returns
+        -------
+
+        done : int
+            Number of runs checkpointed, not counting the ones skipped or
+            failed
+        """
+        if not os.path.isdir(self.outdir):
+            os.makedirs(self.outdir)
+        self.failed = []
+        done = 0
+        pending = self.pending()
+        if not pending:
+            return done
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = dict(
+                (pool.submit(_run_cell, path, cell_params, seed, self.engine,
+                             {'overrides': _describe(overrides),
+                              'seed': seed, 'engine': self.engine}),
+                 (overrides, seed))
+                for path, cell_params, seed, overrides in pending)
+            for future in as_completed(futures):
+                try:
+                    path = future.result()
+                except Exception as exc:
+                    self.failed.append(futures[future] + (exc,))
+                    continue
+                done += 1
+                if callback is not None:
+                    callback(path)
+        return done
+
+    def results(self):
+        """ Yields (overrides, seed, result) for every run on disk, where
+        result is a dict of the series returned by go()"""
+        for path, _, seed, overrides in self.runs():
+            if not os.path.exists(path):
+                continue
+            with np.load(path) as data:
+                yield overrides, seed, dict((name, data[name])
+                                            for name in SERIES)
@@ -0,0 +1,246 @@
+"""
+An on-disk tape of everything that happens in an order book.
+
+The tape is a flat file of fixed size records, written in chunks while
+the book runs.  TapeReader maps the file with np.memmap, so runs larger
+than memory can be summarized without loading them.
+"""
+import json
+
+import numpy as np
+
+from .ticks import to_price
+
+# Kinds of records
+TRADE = 0
+PLACE = 1
+CANCEL = 2
+
+# One record.  For a trade, agent, order_id and side are those of the
+# resting order that was hit and price is the price traded.  For a
+# placement or a cancellation they are those of the limit order.  Prices
+# are in ticks.
+TAPE_DTYPE = np.dtype([('kind', np.int8), ('day', np.int32),
+                       ('second', np.int32), ('agent', np.int32),
+                       ('order_id', np.int64), ('price', np.int64),
+                       ('size', np.float64), ('side', np.int8)])
+
+
+def agents_path(path):
+    """ The file the agent ids of the tape at path are saved in"""
+    return path + '.agents.json'
+
+
+class TapeWriter(object):
+    """
+    Writes a tape, TAPE_DTYPE records appended to a file
+
+    Parameters
+    ----------
+
+    path : str
+        The tape file.  It is overwritten.
+
+    chunk : int
+        Number of records buffered between writes
+
+    Attributes
+    ----------
+
+    agentids : list
+        The agent id of every agent code.  Saved next to the tape when the
+        writer is closed.
+    """
+    def __init__(self, path, chunk=65536):
+        self.path = path
+        self.agentids = []
+        self._codes = {}
+        self._buffer = np.empty(chunk, dtype=TAPE_DTYPE)
+        self._n = 0
+        self._file = open(path, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, kind, time, agentid, order_id, price, size, side):
+        """ Appends a record
+
+        Parameters
+        ----------
+
+        kind : int
+            TRADE, PLACE or CANCEL
+
+        time : tuple
+            (day, second) the record happened at
+
+        agentid : str
+            The id of the agent
+
+        order_id : int
+            The id of the limit order, 0 for none
+
+        price : int
+            The price in ticks
+
+        size : float
+            Number of shares
+
+        side : int
+            BUY or SELL
+        """
+        code = self._codes.get(agentid)
+        if code is None:
+            code = self._codes[agentid] = len(self.agentids)
+            self.agentids.append(agentid)
+        self._buffer[self._n] = (kind, time[0], time[1], code, order_id,
+                                 price, size, side)
+        self._n += 1
+        if self._n == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """ Writes the buffered records to the file"""
+        self._buffer[:self._n].tofile(self._file)
+        self._file.flush()
+        self._n = 0
+
+    def close(self):
+        """ Flushes and closes the tape, and saves the agent ids"""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        with open(agents_path(self.path), 'w') as agents:
+            json.dump(self.agentids, agents)
+
+
+class TapeReader(object):
+    """
+    Reads a tape without copying it into memory
+
+    Parameters
+    ----------
+
+    path : str
+        The tape file
+
+    chunk : int
+        Number of records summarized at a time
+
+    Attributes
+    ----------
+
+    records : np.memmap
+        Every record of the tape
+
+    agentids : list
+        The agent id of every agent code, or None if the writer was not
+        closed
+    """
+    def __init__(self, path, chunk=1 << 20):
+        self.path = path
+        self.chunk = chunk
+        self.records = np.memmap(path, dtype=TAPE_DTYPE, mode='r')
+        try:
+            with open(agents_path(path)) as agents:
+                self.agentids = json.load(agents)
+        except IOError:
+            self.agentids = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def chunks(self):
+        """ Yields the records in chunks of at most chunk records.  The
+        chunks are views of the mapped file."""
+        for start in range(0, len(self.records), self.chunk):
+            yield self.records[start:start + self.chunk]
+
+    def daily(self, classes=None):
+        """ Summarizes the trades of every day in one pass over the tape
+
+        Parameters
+        ----------
+
+        classes : callable
+            Maps an agent id to a small non-negative int.  If given, the
+            volumes are also split by the class of the resting agent, which
+            needs the agent ids saved by TapeWriter.close.
+
+        Returns
+        -------
+
+        days : array
+            Every day from the first to the last day with a trade.  Days
+            with only placements or cancellations, like the day the book
+            is filled on, are left out at either end.
+
+        closes : array
+            The last price traded each day, in dollars.  Days without trades
+            carry the previous close.
+
+        volume : array
+            Shares traded each day, counted once per resting order hit.  If
+            classes is given, an array of shape (number of classes, number
+            of days) instead.
+        """
+        if len(self.records) == 0:
+            empty = np.zeros(0)
+            return empty.astype(np.int64), empty, empty
+        first = int(self.records['day'][0])
+        ndays = int(self.records['day'][-1]) - first + 1
+        closes = np.full(ndays, np.nan)
+        if classes is None:
+            volume = np.zeros(ndays)
+        else:
+            if self.agentids is None:
+                raise ValueError('The agent ids of {0} were not saved, close '
+                                 'the TapeWriter to split volumes by '
+                                 'class'.format(self.path))
+            codes = np.array([classes(agentid) for agentid in self.agentids],
+                             dtype=np.int64)
+            volume = np.zeros((codes.max() + 1 if len(codes) else 1, ndays))
+        for chunk in self.chunks():
+            trades = chunk[chunk['kind'] == TRADE]
+            if len(trades) == 0:
+                continue
+            day = trades['day'].astype(np.int64) - first
+            # Records are in time order, so the last trade of a day is the
+            # first one of the reversed chunk
+            last_days, last = np.unique(day[::-1], return_index=True)
+            closes[last_days] = to_price(trades['price'][::-1][last])
+            if classes is None:
+                volume += np.bincount(day, weights=trades['size'],
+                                      minlength=ndays)
+            else:
+                agent_class = codes[trades['agent']]
+                for k in range(volume.shape[0]):
+                    mask = agent_class == k
+                    volume[k] += np.bincount(day[mask],
+                                             weights=trades['size'][mask],
+                                             minlength=ndays)
+        # Keep the days from the first to the last trade, and carry the last
+        # close over days without trades between them
+        index = np.flatnonzero(~np.isnan(closes))
+        if len(index) == 0:
+            empty = np.zeros(0)
+            return (empty.astype(np.int64), empty,
+                    volume[..., :0] if classes is not None else empty)
+        start, stop = int(index[0]), int(index[-1]) + 1
+        traded = np.where(np.isnan(closes), 0, np.arange(ndays))
+        np.maximum.accumulate(traded, out=traded)
+        closes = closes[traded][start:stop]
+        volume = volume[..., start:stop]
+        return np.arange(first + start, first + stop), closes, volume
+
+    def daily_closes(self):
+        """ The last price traded each day, see daily"""
+        return self.daily()[1]
+
+    def daily_volume(self, classes=None):
+        """ Shares traded each day, see daily"""
+        return self.daily(classes)[2]
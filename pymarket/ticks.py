@@ -0,0 +1,18 @@
+"""
+Prices inside the order book are integer numbers of ticks.  Dollar prices
+only appear at the edges: the last price and closes agents read, and the
+summaries of a run.
+"""
+
+# Number of ticks in one dollar
+TICKS_PER_UNIT = 100
+
+
+def to_ticks(price):
+    """ The nearest tick to a dollar price"""
+    return int(round(price * TICKS_PER_UNIT))
+
+
+def to_price(ticks):
+    """ The dollar price of a number of ticks, or an array of them"""
+    return ticks / float(TICKS_PER_UNIT)
@@ -1,5 +1,45 @@
 import numpy as np
-from math import copysign
+from bisect import bisect_left
+from functools import lru_cache
+from math import copysign, exp, expm1, log
+
+# Number of price spots an order can be placed away from the best price
+SPOTS = 21
+
+# Width of a spot in ticks
+SPOT = 10
+
+# Width of the bins, in log(|diff / rho|), that price_cdf is cached on.
+# Quantizing the rate moves it by at most 0.05%, which moves every point of
+# the CDF by less than 5e-4.
+PRICE_CDF_STEP = 1e-3
+
+
+@lru_cache(maxsize=4096)
+def price_cdf(key):
+    """ The CDF of the number of spots away from the best price an order is
+    placed.  Spot k has probability proportional to
+    exp(-k * rate) - exp(-(k + 1) * rate), truncated to SPOTS spots.  As
+    the rate is quantized, every point of the CDF is within 5e-4 of the
+    CDF at the exact rate, see tests/test_trader.py.
+
+    Parameters
+    ----------
+
+    key : int
+        log(rate) / PRICE_CDF_STEP rounded to an integer, where rate is
+        |diff / rho|
+
+    Returns
+    -------
+
+    cdf : tuple
+        SPOTS increasing floats, the last of which is 1.
+    """
+    rate = exp(key * PRICE_CDF_STEP)
+    total = -expm1(-SPOTS * rate)
+    cdf = tuple(-expm1(-(k + 1) * rate) / total for k in range(SPOTS - 1))
+    return cdf + (1.,)
 
 
 class Trader(object):
@@ -11,7 +51,8 @@ class Trader(object):
         ----------
 
         Book : OrderBook instance
-            The order book instance that the trader participates in
+            The order book instance that the trader participates in.  The
+            trader adds itself to the book's agents.
 
         delta : float
             The standard deviation for in the mean-zero random error
@@ -57,14 +98,15 @@ class Trader(object):
         diff : float
              The difference between the Agent's belief and observed price
 
-        order : 4-tuple
-            The agent's last limit order.  None if no orders
+        order_id : int
+            The book's id for the agent's resting limit order.  None if no
+            orders
 
         oqty : float
             The agent's most recent order quantity
 
-        oprice : float
-            The agent's most recent order price
+        oprice : int
+            The agent's most recent order price in ticks
         """
 
         self.Book = Book
@@ -75,14 +117,12 @@ class Trader(object):
         self.psi = psi
         self.Sigma = Sigma
         self.position = ('out', 'NA')
-        self._side = lambda x: 'S' if x > 0 else 'B'
-        self.order = None
+        self.order_id = None
         self.agentid = agentid
         self.diff = 10**-10
         self.val = initval
-        self._exped = np.exp(np.arange(-(2 / .1 + 1), 1, 1))[::-1]
+        Book.include_agents(self)
 
-    #@profile
     def query_agent(self):
         second = self.Book.second
         # What time is it?
@@ -97,7 +137,7 @@ class Trader(object):
             # Remove limit order if valuation changes
             if copysign(1, diff) != copysign(1, self.diff):
             # If valuation has changed
-                self._remove_order(self.order)
+                self._remove_order()
                 # Remove the order
                 self.position = ('out', 'NA')
                 # Update position
@@ -105,26 +145,20 @@ class Trader(object):
         # Probability of participating
         self.diff = diff
         # Updates last period's diff to this period
-        if np.random.uniform() < p_partic:
+        if self.Book.rng.uniform() < p_partic:
             # If the agent participates
             oprice = self.order_price()
-            # Get order price in $ and cents
+            # Get order price in ticks
             if self.position[0] == 'in':
                 # If the agent has a limit order
-                self._remove_order(self.order)
+                self._remove_order()
                 #remove it
             qty = self.order_quantity()
             # Get the order quantity
-            self.order = [oprice, qty, (self.Book.day, self.Book.second),
-                          self.agentid]
-            # Get the agent's order
-            if oprice != 'Market':
-                oprice = int(oprice * 100)
-                # Change order price to only cents
-            self.Book.order(self.agentid, oprice, o_side, qty,
-                            (self.Book.day, self.Book.second))
-            # place order in terms of cents
-            if self.oprice == 'Market':
+            self.order_id = self.Book.order(self.agentid, oprice, o_side, qty,
+                                            (self.Book.day, self.Book.second))
+            # place order in terms of ticks
+            if self.order_id is None:
                 # If it was a market order
                 self.position = ('out', 'NA')
                 # The agent is out of the market
@@ -133,38 +167,31 @@ class Trader(object):
                 self.position = ('in', o_side)
                 # He has a standing limit order
 
-                #@profile
-    def _remove_order(self, order):
-        """ Removes an order, need to pop key if last order removed!"""
-        try:
-            self.Book.bids[order[0]].remove(order)
-            if len(self.Book.bids[order[0]]) == 0:
-                self.Book.bids.pop(order[0])
-        except KeyError:
-            self.Book.asks[order[0]].remove(order)
-            if len(self.Book.asks[order[0]]) == 0:
-                self.Book.asks.pop(order[0])
-
-    #@profile
+    def _side(self, diff):
+        """ The side of the agent's order, "S" if it believes the stock is
+        overpriced, "B" otherwise"""
+        return 'S' if diff > 0 else 'B'
+
+    def _remove_order(self):
+        """ Cancels the agent's resting limit order"""
+        self.Book.cancel(self.order_id)
+        self.order_id = None
+
     def order_price(self):
-        """ Sets the order price.  If not an order price, set
-        to 'Market' """
-        scale = abs(self.rho / self.diff)
-        exped_fact = 1. / scale
-        exped = np.power(self._exped, exped_fact)
-        pdist = exped[:-1]-exped[1:]
-        cum_pdist = np.cumsum(pdist)
-        cum_pdist = cum_pdist/cum_pdist[-1]
-        spots_away = np.argmin(cum_pdist < np.random.uniform())
+        """ Sets the order price in ticks.  If not an order price, set
+        to 'Market'.  The number of spots away from the best price is drawn
+        by inverse CDF lookup on price_cdf """
+        key = int(round(log(abs(self.diff / self.rho)) / PRICE_CDF_STEP))
+        spots_away = bisect_left(price_cdf(key), self.Book.rng.uniform())
         if spots_away == 0:
             return 'Market'
         elif self.diff > 0:
             # Believes stock is overpriced, so will sell.
-            return max(self.Book.bids.keys())/100. + spots_away * .1
+            return self.Book.best_bid() + spots_away * SPOT
         elif self.diff < 0:
-            return min(self.Book.asks.keys())/100. - spots_away * .1
+            return self.Book.best_ask() - spots_away * SPOT
 
     def order_quantity(self):
         """ Draws the order quantity"""
-        return np.random.normal(self.mu, self.Sigma) + \
+        return self.Book.rng.normal(self.mu, self.Sigma) + \
             self.psi*self.Sigma * abs(self.diff)
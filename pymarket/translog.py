@@ -0,0 +1,214 @@
+import numpy as np
+
+from .ticks import to_price
+
+# Sides of a transaction
+BUY = 1
+SELL = -1
+
+# One transaction: the agent code, the price traded in ticks, the size
+# traded, the time of the order (day, second) and the side of the agent
+TRADE_DTYPE = np.dtype([('agent', np.int32), ('price', np.int64),
+                        ('size', np.float64), ('tday', np.int32),
+                        ('second', np.int32), ('side', np.int8)])
+
+
+class TransactionLog(object):
+    """
+    The transactions of an order book, stored in a growable NumPy
+    structured array.
+
+    Agent ids are stored as integer codes into agentids, and sides as BUY
+    or SELL.  Transactions are logged under the day they happen, which
+    must not decrease, and an offset index gives the slice of every day.
+
+    For code that expects the old defaultdict(list), log[day] is the list
+    of [agentid, price, size, (day, second), side] transactions of a day,
+    with the price in dollars, and keys(), values() and items() iterate
+    over the days.
+
+    Parameters
+    ----------
+
+    capacity : int
+        Number of transactions to allocate room for at first.  The array
+        doubles when it is full.
+
+    Attributes
+    ----------
+
+    agentids : list
+        The agent id of every agent code
+    """
+    def __init__(self, capacity=1024):
+        self._records = np.empty(capacity, dtype=TRADE_DTYPE)
+        self._n = 0
+        self.agentids = []
+        self._codes = {}
+        self._days = []
+        self._offsets = []
+        self._day_index = {}
+
+    def __getstate__(self):
+        # Only the filled part of the array is pickled
+        state = self.__dict__.copy()
+        state['_records'] = self.records.copy()
+        return state
+
+    def __len__(self):
+        """ Number of days in the log"""
+        return len(self._days)
+
+    def __contains__(self, day):
+        return day in self._day_index
+
+    def __iter__(self):
+        return iter(self._days)
+
+    def __getitem__(self, day):
+        return self.trades(day)
+
+    def keys(self):
+        return list(self._days)
+
+    def values(self):
+        return [self.trades(day) for day in self._days]
+
+    def items(self):
+        return [(day, self.trades(day)) for day in self._days]
+
+    def agent_code(self, agentid):
+        """ The integer code of an agent id"""
+        code = self._codes.get(agentid)
+        if code is None:
+            code = self._codes[agentid] = len(self.agentids)
+            self.agentids.append(agentid)
+        return code
+
+    def start_day(self, day):
+        """ Starts logging under day, so days without transactions still
+        appear in the log"""
+        if day not in self._day_index:
+            if self._days and day < self._days[-1]:
+                raise ValueError('Day {0} is before day {1}'.format(
+                    day, self._days[-1]))
+            self._day_index[day] = len(self._days)
+            self._days.append(day)
+            self._offsets.append(self._n)
+
+    def append(self, day, agentid, price, size, time, side):
+        """ Logs a transaction
+
+        Parameters
+        ----------
+
+        day : int
+            The day the transaction happened
+
+        agentid : str
+            The id of the agent
+
+        price : int
+            The price traded in ticks
+
+        size : float
+            Number of shares
+
+        time : tuple
+            The time the agent's order was placed, (day, second)
+
+        side : int
+            BUY or SELL
+        """
+        if not self._days or day != self._days[-1]:
+            self.start_day(day)
+        n = self._n
+        if n == len(self._records):
+            records = np.empty(max(2 * n, 1024), dtype=TRADE_DTYPE)
+            records[:n] = self._records
+            self._records = records
+        self._records[n] = (self.agent_code(agentid), price, size, time[0],
+                            time[1], side)
+        self._n = n + 1
+
+    def extend(self, day, agentids, prices, sizes, tdays, seconds, side):
+        """ Logs transactions of one side in bulk, as append would one
+        after the other
+
+        Parameters
+        ----------
+
+        day : int
+            The day the transactions happened
+
+        agentids : list
+            The id of the agent of each transaction
+
+        prices, sizes : sequence
+            The price traded in ticks and the number of shares of each
+
+        tdays, seconds : sequence
+            The time each agent's order was placed
+
+        side : int
+            BUY or SELL
+        """
+        if not self._days or day != self._days[-1]:
+            self.start_day(day)
+        n = self._n
+        k = len(agentids)
+        if n + k > len(self._records):
+            records = np.empty(max(2 * (n + k), 1024), dtype=TRADE_DTYPE)
+            records[:n] = self._records[:n]
+            self._records = records
+        added = self._records[n:n + k]
+        added['agent'] = [self.agent_code(agentid) for agentid in agentids]
+        added['price'] = prices
+        added['size'] = sizes
+        added['tday'] = tdays
+        added['second'] = seconds
+        added['side'] = side
+        self._n = n + k
+
+    def discard(self):
+        """ Drops every transaction and day logged so far.  The agent codes
+        and the allocated array are kept."""
+        self._n = 0
+        self._days = []
+        self._offsets = []
+        self._day_index = {}
+
+    @property
+    def records(self):
+        """ Every transaction, as a view of the structured array"""
+        return self._records[:self._n]
+
+    @property
+    def days(self):
+        """ The days in the log, in order"""
+        return np.array(self._days, dtype=np.int64)
+
+    @property
+    def offsets(self):
+        """ Where each day starts in records, followed by the number of
+        transactions"""
+        return np.array(self._offsets + [self._n], dtype=np.int64)
+
+    def day_slice(self, day):
+        """ The slice of records logged under day"""
+        i = self._day_index.get(day)
+        if i is None:
+            return slice(0, 0)
+        if i + 1 < len(self._offsets):
+            return slice(self._offsets[i], self._offsets[i + 1])
+        return slice(self._offsets[i], self._n)
+
+    def trades(self, day):
+        """ The transactions of a day in the form
+        [agentid, price, size, (day, second), side], with the price in
+        dollars"""
+        agentids = self.agentids
+        return [[agentids[agent], to_price(price), size, (tday, second),
+                 'B' if side == BUY else 'S']
+                for agent, price, size, tday, second, side
+                in self.records[self.day_slice(day)].tolist()]
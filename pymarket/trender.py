@@ -0,0 +1,15 @@
+from .trader import Trader
+
+class Trender(Trader):
+
+    def __init__(self, Book, phi, rho, mu, psi, Sigma, agentid, delta, beta,
+                 initval=100, horizon=20):
+        super(Trender, self).__init__(Book, phi, rho, mu, psi, Sigma,
+                                      agentid, delta, initval)
+        self.horizon = horizon
+
+    def valuation(self, truep, vt_1):
+        # The book keeps one fit per horizon, updated once per close
+        intercept, slope = self.Book.trend(self.horizon)
+        self.val = intercept + slope * self.horizon * 2
+        return self.val
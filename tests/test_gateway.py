@@ -0,0 +1,94 @@
+"""
+Rejected messages of the gateway.  A bad message gets an error result and
+the batches after it are still applied.
+
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+from pymarket.behavioral_book import initbook
+from pymarket.book import OrderBook
+from pymarket.gateway import Gateway, SocketClient
+
+
+def filled_book():
+    book = OrderBook({}, {}, seed=0)
+    initbook(book)
+    return book
+
+
+async def acks(client, n):
+    """ The next n acks to client, skipping trades and tops"""
+    found = []
+    while len(found) < n:
+        message = await client.receive()
+        if message['type'] == 'ack':
+            found.append(message)
+    return found
+
+
+@pytest.mark.parametrize('order_id', [[1], {'a': 1}, '1', True, 1.5, None])
+def test_bad_cancel(order_id):
+    async def run():
+        book = filled_book()
+        async with Gateway(book) as gateway:
+            port = await gateway.serve()
+            client = await SocketClient.open(port=port)
+            await client.send([{'type': 'cancel', 'order_id': order_id}])
+            await client.send([{'type': 'order', 'price': book.best_bid(),
+                                'side': 'B', 'size': 100}])
+            first, second = await acks(client, 2)
+            await client.close()
+        return first['results'], second['results']
+
+    first, second = asyncio.run(run())
+    assert first == [{'error': 'order_id must be an integer'}]
+    assert isinstance(second[0], int)
+
+
+def test_message_failure():
+    async def run():
+        book = filled_book()
+        async with Gateway(book) as gateway:
+            client = gateway.connect()
+            order = {'type': 'order', 'price': book.best_bid(), 'side': 'B',
+                     'size': 100}
+            await client.send([order])
+            placed, = await acks(client, 1)
+
+            def fail(*args):
+                raise KeyError('broken')
+            book.order = fail
+            await client.send([order])
+            failed, = await acks(client, 1)
+            del book.order
+            order_id = placed['results'][0]
+            await client.send([{'type': 'cancel', 'order_id': order_id}])
+            cancelled, = await acks(client, 1)
+            return failed['results'], cancelled['results']
+
+    failed, cancelled = asyncio.run(run())
+    assert failed == [{'error': "KeyError: 'broken'"}]
+    assert cancelled == [True]
+
+
+def test_stop_raises():
+    async def run():
+        book = filled_book()
+        gateway = Gateway(book)
+        gateway.start()
+        client = gateway.connect()
+
+        def fail():
+            raise RuntimeError('broken')
+        gateway._top_of_book = fail
+        await client.send([{'type': 'cancel', 'order_id': 1}])
+        await client.receive()
+        # The failure closes the client instead of leaving it waiting
+        assert await client.receive() is None
+        await gateway.stop()
+
+    with pytest.raises(RuntimeError, match='broken'):
+        asyncio.run(run())
@@ -0,0 +1,217 @@
+"""
+Parity of the matching kernel.  kernel.match compiled with Numba, its
+plain Python version and the heap ladder must give identical fills.
+
+    python -m pytest tests
+"""
+import copy
+
+import numpy as np
+import pytest
+
+from pymarket import kernel
+from pymarket.behavioral_book import setup, run_days
+from pymarket.book import OrderBook, DenseLevels
+
+needs_numba = pytest.mark.skipif(not kernel.HAVE_NUMBA,
+                                 reason='Numba is not installed')
+
+KERNELS = [pytest.param(kernel.match_python, id='python'),
+           pytest.param(kernel.match, id='numba', marks=needs_numba)]
+
+
+def random_side(seed, side, orders=400):
+    """ A DenseLevels side with orders of random sizes within 60 ticks of
+    10000"""
+    rng = np.random.default_rng(seed)
+    levels = DenseLevels(side, center=10000, width=256, capacity=16)
+    sign = -1 if side == 'B' else 1
+    for order_id in range(1, orders + 1):
+        price = 10000 + sign * int(rng.integers(1, 60))
+        levels.add(price, float(rng.integers(1, 50)), (0, order_id), 'A',
+                   order_id)
+    return levels, rng
+
+
+def expected_fills(levels, size):
+    """ The fills of a market order of size, one resting order at a time"""
+    fills = []
+    for price in levels.top(len(levels)):
+        for order_id, order_size, _, _ in levels.orders(price):
+            if size <= 0:
+                return fills
+            fill = min(order_size, size)
+            fills.append((order_id, price, fill))
+            size = size - fill
+    return fills
+
+
+def check_ladder(levels):
+    """ The level arrays agree with the orders linked on them"""
+    prices = list(levels)
+    assert len(levels) == len(prices)
+    for price in prices:
+        orders = levels.orders(price)
+        assert levels.count[price - levels.base] == len(orders)
+        assert levels.size_at(price) == pytest.approx(
+            sum(size for _, size, _, _ in orders))
+    if prices:
+        assert levels.best() == (prices[-1] if levels.side == 'B'
+                                 else prices[0])
+    assert levels.volume() == pytest.approx(levels.depth.sum())
+    empty = levels.count == 0
+    assert not levels.depth[empty].any()
+    assert (levels.head[empty] == -1).all()
+
+
+@pytest.mark.parametrize('match', KERNELS)
+@pytest.mark.parametrize('side', ['B', 'S'])
+@pytest.mark.parametrize('seed', range(5))
+def test_match_fills(match, side, seed):
+    levels, rng = random_side(seed, side)
+    while levels.volume() > 0:
+        size = min(float(rng.integers(1, 800)), levels.volume())
+        expected = expected_fills(levels, size)
+        slots, prices, fills = levels.match(size, match)
+        assert list(zip(levels.order_ids[slots].tolist(), prices,
+                        fills)) == expected
+        for slot in slots:
+            if levels.sizes[slot] == 0:
+                levels.release(slot)
+        check_ladder(levels)
+    assert len(levels) == 0
+    with pytest.raises(ValueError):
+        levels.best()
+
+
+@needs_numba
+@pytest.mark.parametrize('seed', range(5))
+def test_compiled_matches_python(seed):
+    levels, rng = random_side(seed, 'S')
+    compiled = copy.deepcopy(levels)
+    for size in rng.integers(1, 800, 20).tolist():
+        assert levels.match(size, kernel.match_python) == \
+            compiled.match(size, kernel.match)
+        for name in ('depth', 'count', 'head', 'tail', 'sizes', 'next',
+                     'prev'):
+            assert np.array_equal(getattr(levels, name),
+                                  getattr(compiled, name))
+        assert levels._best == compiled._best
+
+
+def random_batch(seed, n=3000):
+    """ Limit orders around 10000 ticks and market orders small enough
+    that the book never empties"""
+    rng = np.random.default_rng(seed)
+    market = rng.random(n) < .2
+    sides = np.where(rng.random(n) < .5, 'B', 'S')
+    away = rng.integers(1, 40, n)
+    prices = np.where(sides == 'B', 10000 - away, 10000 + away).astype(float)
+    prices[market] = np.nan
+    prices[:200] = np.where(sides[:200] == 'B', 9950., 10050.)
+    sizes = rng.integers(1, 100, n).astype(float)
+    sizes[:200] = 1000.
+    times = np.column_stack([np.zeros(n, dtype=int), np.arange(n)])
+    agents = ['A{0}'.format(i % 37) for i in range(n)]
+    return agents, prices, sides, sizes, times, rng
+
+
+BOOKS = [pytest.param({'ladder': 'dense', 'matching': 'python'},
+                      id='dense-python'),
+         pytest.param({'ladder': 'dense', 'matching': 'kernel'},
+                      id='dense-kernel')]
+
+
+@pytest.mark.parametrize('book', BOOKS)
+@pytest.mark.parametrize('seed', range(3))
+def test_book_fills(book, seed):
+    results = []
+    for kwargs in ({}, book):
+        agents, prices, sides, sizes, times, rng = random_batch(seed)
+        order_book = OrderBook({}, {}, seed=seed, **kwargs)
+        fills, order_ids = order_book.submit_batch(agents, prices, sides,
+                                                   sizes, times)
+        cancelled = [order_book.cancel(order_id)
+                     for order_id in rng.permutation(order_ids).tolist()
+                     if order_id and rng.random() < .5]
+        results.append((fills, order_ids,
+                        [None if order is None else repr(order)
+                         for order in cancelled],
+                        order_book.transactions.records.copy(),
+                        order_book.depth(10)))
+    heap, dense = results
+    assert np.array_equal(heap[0], dense[0])
+    assert np.array_equal(heap[1], dense[1])
+    assert heap[2] == dense[2]
+    assert np.array_equal(heap[3], dense[3])
+    for heap_side, dense_side in zip(heap[4], dense[4]):
+        assert np.array_equal(heap_side, dense_side)
+
+
+def book_state(order_book):
+    """ What a market order can change in a book"""
+    return (order_book.transactions.records.copy(),
+            order_book.transactions.agentids[:], order_book.last,
+            sorted(order_book._orders), order_book.depth(100))
+
+
+def assert_same_state(heap, dense):
+    assert np.array_equal(heap[0], dense[0])
+    assert heap[1:4] == dense[1:4]
+    for heap_side, dense_side in zip(heap[4], dense[4]):
+        assert np.array_equal(heap_side, dense_side)
+
+
+@pytest.mark.parametrize('book', BOOKS)
+@pytest.mark.parametrize('size', [0., -5.])
+def test_empty_market_order(book, size):
+    """ A market order for no shares trades nothing, on its own or in a
+    batch"""
+    states = []
+    for kwargs in ({}, book):
+        agents, prices, sides, sizes, times, _ = random_batch(0, n=400)
+        order_book = OrderBook({}, {}, seed=0, **kwargs)
+        order_book.submit_batch(agents, prices, sides, sizes, times)
+        for side in 'BS':
+            assert order_book.order('X', 'Market', side, size, (0, 500)) \
+                is None
+        fills, order_ids = order_book.submit_batch(
+            ['X', 'Y'], np.array([np.nan, np.nan]), np.array(['B', 'S']),
+            np.array([size, size]), np.array([[0, 501], [0, 502]]))
+        assert len(fills) == 0
+        assert order_ids.tolist() == [0, 0]
+        states.append(book_state(order_book))
+    assert_same_state(*states)
+
+
+@pytest.mark.parametrize('book', BOOKS)
+@pytest.mark.parametrize('side', ['B', 'S'])
+def test_market_order_too_large(book, side):
+    """ A market order larger than the other side raises before it
+    trades"""
+    states = []
+    for kwargs in ({}, book):
+        agents, prices, sides, sizes, times, _ = random_batch(1, n=400)
+        order_book = OrderBook({}, {}, seed=1, **kwargs)
+        order_book.submit_batch(agents, prices, sides, sizes, times)
+        before = book_state(order_book)
+        with pytest.raises(ValueError, match='No orders on the'):
+            order_book.order('X', 'Market', side, 1e9, (0, 500))
+        after = book_state(order_book)
+        assert_same_state(before, after)
+        states.append(after)
+    assert_same_state(*states)
+
+
+@pytest.mark.parametrize('matching', ['python', 'kernel'])
+@pytest.mark.parametrize('engine', ['objects', 'arrays'])
+def test_simulation_fills(engine, matching):
+    logs = []
+    for kwargs in ({}, {'ladder': 'dense', 'matching': matching}):
+        state = setup(1, engine, **kwargs)
+        run_days(state, 120, verbose=False)
+        logs.append(state['book'].transactions)
+    heap, dense = logs
+    assert heap.agentids == dense.agentids
+    assert np.array_equal(heap.records, dense.records)
+    assert np.array_equal(heap.offsets, dense.offsets)
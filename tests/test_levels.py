@@ -0,0 +1,28 @@
+"""
+The best prices of the heap ladder.  PriceLevels.top must list the
+populated prices best first, however many removed prices linger in the
+heap.
+
+    python -m pytest tests
+"""
+import random
+
+import pytest
+
+from pymarket.book import PriceLevels, OrderQueue
+
+
+@pytest.mark.parametrize('side', ['B', 'S'])
+@pytest.mark.parametrize('seed', range(20))
+def test_top(side, seed):
+    rng = random.Random(seed)
+    levels = PriceLevels(side)
+    for _ in range(rng.randint(0, 400)):
+        price = rng.randint(900, 1100)
+        if price in levels and rng.random() < 0.6:
+            del levels[price]
+        else:
+            levels.setdefault(price, OrderQueue())
+    expected = sorted(levels, reverse=side == 'B')
+    for n in (0, 1, 5, 50, 1000):
+        assert levels.top(n) == expected[:n]
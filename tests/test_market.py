@@ -0,0 +1,41 @@
+"""
+Errors of a ParallelMarket.  A message that raises in a worker raises the
+same error in the parent, like in a Market, and leaves the workers
+running.
+
+    python -m pytest tests
+"""
+import pytest
+
+from pymarket.behavioral_book import initbook
+from pymarket.market import Market, ParallelMarket
+
+SYMBOLS = ['x', 'y', 'z']
+
+# A market order for more shares than the book holds
+BAD = {'y': [('order', 'y', 'Market', 'S', 1e9, 6)]}
+
+
+def test_sequential_error():
+    market = Market(SYMBOLS, vol=1., seed=1, init=initbook)
+    with pytest.raises(ValueError, match='No orders on the B side'):
+        market.run_day(BAD)
+
+
+def test_worker_error():
+    with ParallelMarket(SYMBOLS, vol=1., seed=1, init=initbook,
+                        workers=2) as market:
+        with pytest.raises(ValueError, match='No orders on the B side'):
+            market.run_day(BAD)
+        assert sorted(market.run_day({})) == SYMBOLS
+        assert sorted(market.collect()) == SYMBOLS
+
+
+def test_close_dead_worker():
+    market = ParallelMarket(SYMBOLS, vol=1., seed=1, init=initbook,
+                            workers=2)
+    _, process = market._workers[0]
+    process.terminate()
+    process.join()
+    market.close()
+    assert market._workers == []
@@ -0,0 +1,46 @@
+"""
+Summaries of a finished run.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+
+from pymarket.behavioral_book import setup, run_days, Results
+
+
+@pytest.mark.parametrize('engine', ['objects', 'arrays'])
+def test_x_axis(engine):
+    state = setup(1, engine)
+    run_days(state, 30, verbose=False)
+    population = state['population']
+    results = Results(state['book'], nagents=None if population is None
+                      else len(population))
+    x = results.get_x_axis()
+    assert np.isfinite(x).all()
+    assert x.max() < 30
+
+
+def test_x_axis_without_agents():
+    state = setup(1, 'arrays')
+    run_days(state, 3, verbose=False)
+    with pytest.raises(ValueError, match='nagents'):
+        Results(state['book']).get_x_axis()
+
+
+def test_daily_from_tape(tmp_path):
+    tape = str(tmp_path / 'run.tape')
+    state = setup(1, 'objects', tape=tape)
+    run_days(state, 60, verbose=False)
+    book = state['book']
+    book.tape.close()
+    log = book.transactions
+    traded = np.diff(log.offsets) > 0
+    first = traded.argmax()
+    days, closes, volume = Results(None, tape).daily()
+    # The day the book was filled on, before any trade, is left out
+    assert days.tolist() == log.days[first:].tolist()
+    assert not np.isnan(closes).any()
+    tickets = Results(book).get_tickets()[1]
+    assert np.allclose(closes[traded[first:]], tickets[first:][traded[first:]])
+    assert volume.shape == (3, len(days))
@@ -0,0 +1,46 @@
+"""
+The cached price CDF of Trader.order_price.  Quantizing the rate may move
+every point of the CDF by less than 5e-4, see PRICE_CDF_STEP.
+
+    python -m pytest tests
+"""
+from math import log
+
+import numpy as np
+import pytest
+
+from pymarket.trader import PRICE_CDF_STEP, SPOTS, price_cdf
+
+# Bound on the error of every point of the CDF
+TOLERANCE = 5e-4
+
+
+def exact_cdf(rho, diff):
+    """ The CDF as order_price built it before it was cached"""
+    exped = np.exp(np.arange(-(2 / .1 + 1), 1, 1))[::-1]
+    scale = abs(rho / diff)
+    exped = np.power(exped, 1. / scale)
+    cdf = np.cumsum(exped[:-1] - exped[1:])
+    return cdf / cdf[-1]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_price_cdf(seed):
+    rng = np.random.default_rng(seed)
+    rhos = np.exp(rng.uniform(log(1e-3), log(1e3), 2000))
+    diffs = np.exp(rng.uniform(log(1e-5), log(1e2), 2000)) * \
+        rng.choice([-1, 1], 2000)
+    for rho, diff in zip(rhos.tolist(), diffs.tolist()):
+        key = int(round(log(abs(diff / rho)) / PRICE_CDF_STEP))
+        cdf = np.array(price_cdf(key))
+        assert len(cdf) == SPOTS
+        assert np.abs(cdf - exact_cdf(rho, diff)).max() < TOLERANCE
+
+
+@pytest.mark.parametrize('rate', [1e-6, 1e-3, .1, 1., 10., 300.])
+def test_price_cdf_rates(rate):
+    key = int(round(log(rate) / PRICE_CDF_STEP))
+    cdf = np.array(price_cdf(key))
+    assert np.all(np.diff(cdf) >= 0)
+    assert cdf[-1] == 1.
+    assert np.abs(cdf - exact_cdf(1., rate)).max() < TOLERANCE